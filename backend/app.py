@@ -1,5 +1,6 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import geopandas as gpd
 import pandas as pd
 import numpy as np
@@ -9,16 +10,52 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict
 from sqlalchemy import create_engine
 import os
+import time
+import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
+from utils.metrics import REQUEST_DURATION, flush_metrics, render_metrics
+from utils.profiling import is_profiling_requested, profile_request
+from utils.responses import CompressionMiddleware
+from utils.workers import shutdown_process_pool, warm_process_pool
+from services.region_service import preload_regions
+
 # Подключаем роутеры
 from routers.facilities import router as facilities_router
 from routers.ai_recommendations import router as ai_recommendations_router  # Добавляем импорт роутера AI рекомендаций
+from routers.placement import router as placement_router
+from routers.coverage import router as coverage_router
+from routers.capacity import router as capacity_router
 
 # Загрузка переменных окружения
 load_dotenv()
 
-app = FastAPI(title="InfraMap")
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Регионы загружаются до запуска пула процессов, чтобы его процессы унаследовали их при fork.
+    # Пул запускается до первого запроса, пока в процессе нет потоков обработки запросов:
+    # иначе дочерний процесс мог бы унаследовать захваченную блокировку реестра регионов.
+    # Под gunicorn регионы уже загружены мастером, здесь они берутся из кэша.
+    try:
+        preload_regions()
+    except OSError as e:
+        logger.warning("Regions were not preloaded: %s", e)
+    warm_process_pool()
+    yield
+    shutdown_process_pool()
+    flush_metrics(force=True)
+
+
+app = FastAPI(title="InfraMap", lifespan=lifespan)
 
 # Настройка CORS
 app.add_middleware(
@@ -29,6 +66,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие ответов (brotli, если установлен, иначе gzip) - GeoJSON сжимается в 5-10 раз
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+)
+
+# Замер времени обработки запросов и профилирование по ?profile=1
+@app.middleware("http")
+async def instrumentation_middleware(request: Request, call_next):
+    profiled = is_profiling_requested(request)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        if profiled:
+            response = await profile_request(request, call_next)
+        else:
+            response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Используем шаблон маршрута, а не сам путь, чтобы не плодить метки.
+        # Профилированные запросы медленнее обычных, поэтому помечаются отдельно
+        route = request.scope.get("route")
+        REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            path=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+            profiled=str(profiled).lower(),
+        )
+        # Под gunicorn гистограммы рабочего процесса попадают в общий каталог метрик
+        flush_metrics()
+
 # Модели данных
 class FacilityType(BaseModel):
     type: str
@@ -55,9 +125,16 @@ class RecommendationResponse(BaseModel):
 async def root():
     return {"message": "Welcome to GovFacility Recommender API"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Подключаем роутеры
 app.include_router(facilities_router, prefix="")
 app.include_router(ai_recommendations_router, prefix="")  # Подключаем роутер AI рекомендаций
+app.include_router(placement_router, prefix="")
+app.include_router(coverage_router, prefix="")
+app.include_router(capacity_router, prefix="")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1 @@
+# Бенчмарки горячих путей (python -m benchmarks.run)
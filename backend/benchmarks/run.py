@@ -0,0 +1,236 @@
+"""
+Бенчмарки горячих путей пространственного анализа и API
+
+Запуск из каталога backend:
+    python -m benchmarks.run --scales 1 10 100 --output benchmarks/results/latest.json
+    python -m benchmarks.run --compare benchmarks/results/baseline.json --fail-on-regression
+
+По умолчанию запросы к БД выполняются на временной SQLite. Для замеров на MySQL
+укажите отдельную тестовую базу в BENCHMARK_DATABASE_URL (таблица facilities будет пересоздана).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# Подменяем БД до импорта моделей, чтобы бенчмарк никогда не писал в рабочую базу
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCHMARK_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.gettempdir(), 'haka_benchmark.db')}",
+)
+
+import numpy as np  # noqa: E402
+
+from benchmarks import synthetic  # noqa: E402
+from constants.facilities import COVERAGE_RADIUS, FACILITY_CAPACITY  # noqa: E402
+from models.database import Base, FacilityModel, SessionLocal, engine  # noqa: E402
+from routers.ai_recommendations import AIRecommendationRequest, extract_recommendations_from_response  # noqa: E402
+from routers.facilities import get_facilities  # noqa: E402
+from services.analysis_service import AnalysisService  # noqa: E402
+from services.capacity_service import assign_demand  # noqa: E402
+from services.data_service import DataService  # noqa: E402
+from services.placement_service import greedy_max_coverage  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "latest.json")
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """
+    Запускает функцию repeat раз и возвращает статистику времени (секунды)
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def load_facilities_table(facilities: List[Dict]) -> None:
+    """
+    Пересоздает таблицу facilities и заполняет ее синтетическими данными
+    """
+    FacilityModel.__table__.drop(bind=engine, checkfirst=True)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(FacilityModel, facilities)
+        db.commit()
+
+
+def build_cases(scale: int, seed: int) -> Dict[str, Callable[[], object]]:
+    """
+    Готовит данные для масштаба и возвращает словарь name -> замеряемая функция
+    """
+    layer = synthetic.make_population_layer(scale, seed)
+    bounds = synthetic.layer_bbox(layer)
+    facilities = synthetic.make_facilities(layer, scale, seed)
+    bboxes = synthetic.make_bboxes(bounds, seed=seed)
+
+    analysis = AnalysisService()
+    data_service = DataService()
+
+    schools = synthetic.facilities_to_gdf(facilities, "school")
+    radius_m = COVERAGE_RADIUS["school"] * 1000
+    access_areas = analysis.calculate_access_areas(schools, radius_m)
+    old_access_areas = analysis.calculate_access_areas(schools.iloc[: len(schools) // 2], radius_m)
+    population_gdf = synthetic.layer_to_gdf(layer)
+    area = synthetic.study_area(bounds)
+    school_coords = np.column_stack([schools.geometry.y.values, schools.geometry.x.values])
+
+    load_facilities_table(facilities)
+    layer.tree  # индекс строим вне замеров
+
+    def query_bboxes():
+        with SessionLocal() as db:
+            for b in bboxes:
+                get_facilities(
+                    min_lat=b["min_lat"], max_lat=b["max_lat"], min_lon=b["min_lon"], max_lon=b["max_lon"],
+                    facility_type="school", city=None, country=None, db=db,
+                )
+
+    return {
+        "analysis.calculate_access_areas": lambda: analysis.calculate_access_areas(schools, radius_m),
+        "analysis.find_underserved_areas": lambda: analysis.find_underserved_areas(area, access_areas),
+        "analysis.calculate_improvement_score": lambda: analysis.calculate_improvement_score(
+            old_access_areas, access_areas, population_gdf
+        ),
+        "analysis.find_demand_hotspots": lambda: analysis.find_demand_hotspots(layer, max_radius=radius_m),
+        "data.get_population_density": lambda: data_service.get_population_density(bounds),
+        "data.find_optimal_locations": lambda: data_service.find_optimal_locations(
+            "school", bounds, schools, population_gdf, num_recommendations=10
+        ),
+        "placement.greedy_max_coverage": lambda: greedy_max_coverage(
+            layer, school_coords, COVERAGE_RADIUS["school"], 10
+        ),
+        "capacity.assign_demand": lambda: assign_demand(
+            layer, school_coords, FACILITY_CAPACITY["school"], COVERAGE_RADIUS["school"]
+        ),
+        "db.facilities_bbox_x20": query_bboxes,
+    }
+
+
+def build_parser_cases(seed: int) -> Dict[str, Callable[[], object]]:
+    """
+    Разбор ответа LLM не зависит от масштаба данных
+    """
+    request = AIRecommendationRequest(target_facility_type="school", recommendations_count=6)
+    responses = synthetic.make_llm_response(seed=seed)
+    return {
+        f"ai.extract_recommendations.{kind}": (lambda text=text: extract_recommendations_from_response(text, request))
+        for kind, text in responses.items()
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales: List[int], repeat: int, seed: int, only: Optional[str]) -> Dict:
+    results = []
+
+    def record(name: str, scale: Optional[int], fn: Callable[[], object]):
+        if only and only not in name:
+            return
+        stats = measure(fn, repeat)
+        results.append({"name": name, "scale": scale, **stats})
+        print(f"{name:<45} x{scale if scale else '-':<4} median {stats['median'] * 1000:10.2f} ms")
+
+    for name, fn in build_parser_cases(seed).items():
+        record(name, None, fn)
+
+    for scale in scales:
+        for name, fn in build_cases(scale, seed).items():
+            record(name, scale, fn)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": engine.url.get_backend_name(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """
+    Сравнивает медианы с предыдущим прогоном
+
+    :param threshold: Допустимое относительное замедление (0.2 = 20%)
+    :return: Список регрессий
+    """
+    previous = {(r["name"], r["scale"]): r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"\nСравнение с {baseline.get('meta', {}).get('revision')} ({baseline.get('meta', {}).get('timestamp')}):")
+    for result in current["results"]:
+        old = previous.get((result["name"], result["scale"]))
+        if old is None or old["median"] <= 0:
+            continue
+        ratio = result["median"] / old["median"]
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESSION"
+            regressions.append({**result, "baseline_median": old["median"], "ratio": ratio})
+        elif ratio < 1 - threshold:
+            mark = "  faster"
+        scale = result["scale"] if result["scale"] else "-"
+        print(f"{result['name']:<45} x{scale:<4} {ratio:6.2f}x{mark}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки пространственного анализа и API")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="Масштабы относительно Бишкека")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество повторов каждого замера")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="Запускать только бенчмарки, содержащие подстроку")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Куда сохранить результаты (JSON)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Порог регрессии (доля)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    current = run(args.scales, args.repeat, args.seed, args.only)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\nРегрессий: {len(regressions)}")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Генераторы синтетических данных для бенчмарков (масштаб 1 = Бишкек)
+"""
+from typing import Dict, List
+
+import geopandas as gpd
+import h3
+import numpy as np
+from shapely.geometry import Point, box
+
+from constants.facilities import COVERAGE_RADIUS
+from services.population_service import PopulationLayer
+
+# Центр Бишкека и параметры реального слоя населения
+CENTER_LAT, CENTER_LON = 42.8746, 74.5698
+BISHKEK_CELLS = 238
+BISHKEK_POPULATION = 1_166_668
+H3_RESOLUTION = 8
+
+# Примерное количество объектов одного типа в Бишкеке
+FACILITIES_PER_TYPE = 60
+
+
+def _disk_size(k: int) -> int:
+    return 3 * k * (k + 1) + 1
+
+
+def make_population_layer(scale: int = 1, seed: int = 0) -> PopulationLayer:
+    """
+    Слой населения из H3-гексагонов вокруг центра Бишкека.
+    Количество гексагонов и население растут пропорционально масштабу.
+    """
+    rng = np.random.default_rng(seed)
+    target = BISHKEK_CELLS * scale
+    k = 0
+    while _disk_size(k) < target:
+        k += 1
+
+    center = h3.latlng_to_cell(CENTER_LAT, CENTER_LON, H3_RESOLUTION)
+    cells = sorted(h3.grid_disk(center, k))[:target]
+    latlng = np.array([h3.cell_to_latlng(c) for c in cells], dtype=np.float64)
+
+    # Плотность убывает от центра, поверх - логнормальный шум
+    distance = np.hypot(latlng[:, 0] - CENTER_LAT, latlng[:, 1] - CENTER_LON)
+    density = np.exp(-distance / max(distance.max(), 1e-9) * 3) * rng.lognormal(0, 0.5, len(cells))
+    population = np.round(density / density.sum() * BISHKEK_POPULATION * scale)
+
+    return PopulationLayer(
+        h3_ids=np.array(cells, dtype=object),
+        lat=latlng[:, 0],
+        lon=latlng[:, 1],
+        population=population,
+    )
+
+
+def layer_bbox(layer: PopulationLayer) -> Dict[str, float]:
+    """
+    Охват слоя в формате bounds (min_lat, min_lon, max_lat, max_lon)
+    """
+    return {
+        "min_lat": float(layer.lat.min()),
+        "min_lon": float(layer.lon.min()),
+        "max_lat": float(layer.lat.max()),
+        "max_lon": float(layer.lon.max()),
+    }
+
+
+def make_bboxes(bounds: Dict[str, float], count: int = 20, seed: int = 0) -> List[Dict[str, float]]:
+    """
+    Случайные окна карты внутри охвата (как запросы фронтенда при перемещении карты)
+    """
+    rng = np.random.default_rng(seed)
+    lat_span = bounds["max_lat"] - bounds["min_lat"]
+    lon_span = bounds["max_lon"] - bounds["min_lon"]
+    result = []
+    for _ in range(count):
+        size = rng.uniform(0.1, 0.5)
+        min_lat = bounds["min_lat"] + rng.uniform(0, 1 - size) * lat_span
+        min_lon = bounds["min_lon"] + rng.uniform(0, 1 - size) * lon_span
+        result.append({
+            "min_lat": min_lat,
+            "min_lon": min_lon,
+            "max_lat": min_lat + size * lat_span,
+            "max_lon": min_lon + size * lon_span,
+        })
+    return result
+
+
+def make_facilities(layer: PopulationLayer, scale: int = 1, seed: int = 0) -> List[Dict]:
+    """
+    Объекты всех типов из COVERAGE_RADIUS, размещенные пропорционально населению
+    """
+    rng = np.random.default_rng(seed)
+    weights = layer.population / layer.population.sum()
+    facilities = []
+    for facility_type in COVERAGE_RADIUS:
+        n = FACILITIES_PER_TYPE * scale
+        idx = rng.choice(len(layer), size=n, p=weights)
+        lat = layer.lat[idx] + rng.normal(0, 0.002, n)
+        lon = layer.lon[idx] + rng.normal(0, 0.002, n)
+        for i in range(n):
+            facilities.append({
+                "name": f"{facility_type}_{i}",
+                "address": f"Синтетический адрес {i}",
+                "latitude": float(lat[i]),
+                "longitude": float(lon[i]),
+                "facility_type": facility_type,
+                "city": "Бишкек",
+                "country": "Кыргызстан",
+            })
+    return facilities
+
+
+def facilities_to_gdf(facilities: List[Dict], facility_type: str) -> gpd.GeoDataFrame:
+    rows = [f for f in facilities if f["facility_type"] == facility_type]
+    return gpd.GeoDataFrame(
+        {"name": [f["name"] for f in rows]},
+        geometry=[Point(f["longitude"], f["latitude"]) for f in rows],
+        crs="EPSG:4326",
+    )
+
+
+def layer_to_gdf(layer: PopulationLayer) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        {"population": layer.population},
+        geometry=gpd.points_from_xy(layer.lon, layer.lat),
+        crs="EPSG:4326",
+    )
+
+
+def study_area(bounds: Dict[str, float]) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        geometry=[box(bounds["min_lon"], bounds["min_lat"], bounds["max_lon"], bounds["max_lat"])],
+        crs="EPSG:4326",
+    )
+
+
+def make_llm_response(count: int = 6, seed: int = 0) -> Dict[str, str]:
+    """
+    Типичные варианты ответа LLM: GeoJSON в markdown-блоке и координаты в тексте
+    """
+    rng = np.random.default_rng(seed)
+    lon = CENTER_LON + rng.uniform(-0.1, 0.1, count)
+    lat = CENTER_LAT + rng.uniform(-0.05, 0.05, count)
+    features = ",\n".join(
+        '{"type": "Feature", "geometry": {"type": "Point", "coordinates": [%.6f, %.6f]}, '
+        '"properties": {"name": "Location %d", "type": "recommendation", "reason": "Coverage gap"}}'
+        % (x, y, i + 1)
+        for i, (x, y) in enumerate(zip(lon, lat))
+    )
+    markdown = "Here is the result:\n```json\n{\"type\": \"FeatureCollection\", \"features\": [\n%s\n]}\n```" % features
+    plain = "\n".join(
+        "Location %d: [%.6f, %.6f] reason: coverage gap" % (i + 1, x, y)
+        for i, (x, y) in enumerate(zip(lon, lat))
+    )
+    return {"markdown_geojson": markdown, "plain_coordinates": plain}
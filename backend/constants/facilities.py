@@ -13,6 +13,73 @@ COVERAGE_RADIUS = {
     "fire_station": 3
 }
 
+# Вместимость одного объекта - сколько жителей он может обслужить
+FACILITY_CAPACITY = {
+    "school": 12000,
+    "hospital": 60000,
+    "clinic": 25000,
+    "kindergarten": 6000,
+    "college": 40000,
+    "university": 150000,
+    "fire_station": 100000
+}
+
+# Во сколько раз радиус распределения жителей по объектам больше радиуса охвата
+# (жители переполненного объекта уходят к более далекому свободному)
+ASSIGNMENT_REACH_FACTOR = 3
+
+# Соответствие тегов OSM amenity типам объектов из COVERAGE_RADIUS
+OSM_AMENITY_TYPES = {
+    "school": "school",
+    "kindergarten": "kindergarten",
+    "college": "college",
+    "university": "university",
+    "hospital": "hospital",
+    "clinic": "clinic",
+    "health_centre": "clinic",
+    "doctors": "clinic",
+    "fire_station": "fire_station"
+}
+
+# Регион по умолчанию
+DEFAULT_REGION = "bishkek"
+
+# Реестр регионов. boundary - путь к границе (относительно каталога backend):
+# city_polygon.json со строками "lat, lon" или GeoJSON; population - слой H3
+# (None - слой по умолчанию); crs - метрическая СК (None - локальная по центру границы).
+# Дополнительные регионы (например, области) подключаются JSON-файлом из REGIONS_PATH.
+REGIONS = {
+    "bishkek": {
+        "name": "Бишкек",
+        "boundary": "city_polygon.json",
+        "population": None,
+        "crs": None
+    }
+}
+
+# Приоритетные (недостаточно развитые) зоны по регионам.
+# coordinates - вершины зоны [longitude, latitude], weight - множитель веса жителей зоны,
+# share - минимальная доля рекомендаций в зоне (для промпта AI)
+PRIORITY_ZONES = {
+    "bishkek": [
+        {
+            "name": "northwest",
+            "coordinates": [[74.446171, 42.888538], [74.555247, 42.892399], [74.452587, 42.854614], [74.536686, 42.830083]],
+            "weight": 2.0,
+            "share": 0.4
+        }
+    ]
+}
+
+# Целевые функции размещения
+PLACEMENT_OBJECTIVES = ("coverage", "p_median", "min_max")
+
+# Функции затухания доступности с расстоянием
+DISTANCE_DECAY_TYPES = ("step", "linear", "exponential", "gaussian")
+
+# Во сколько раз радиус поиска для p_median и min_max больше радиуса охвата
+OBJECTIVE_REACH_FACTOR = 3
+
 # Названия типов объектов
 FACILITY_NAMES = {
     "school": "Школа",
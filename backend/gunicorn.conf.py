@@ -0,0 +1,55 @@
+"""
+Конфигурация gunicorn для продакшена: gunicorn -c gunicorn.conf.py app:app
+
+Мастер-процесс один раз импортирует приложение и загружает регионы (слой населения,
+граница, индексы, матрицы расстояний), после чего запускает рабочие процессы через fork.
+Рабочие процессы и их пулы для расчетов получают эти данные copy-on-write, без копирования.
+Процессы пула регионы сами не загружают, поэтому на рабочий процесс вместе с пулом приходится
+не больше REGION_CACHE_SIZE загруженных регионов.
+
+Гистограммы /metrics рабочие процессы записывают в METRICS_MULTIPROC_DIR, и любой из них
+отдает сумму по всем процессам. Каталог очищается при запуске мастера.
+"""
+import gc
+import os
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8001")
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Пул процессов для расчетов (utils.workers) делит ядра между рабочими процессами
+os.environ.setdefault("WEB_CONCURRENCY", str(workers))
+os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "inframap-metrics"))
+
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Расчеты размещения на крупных регионах могут занимать десятки секунд
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    from utils.metrics import reset_multiproc_dir
+
+    # Метрики предыдущего запуска не суммируются с новыми
+    reset_multiproc_dir()
+
+
+def when_ready(server):
+    # Вызывается в мастере после импорта приложения и до запуска рабочих процессов
+    from services.region_service import preload_regions
+
+    preload_regions()
+    # Загруженные объекты переносятся в постоянное поколение: сборщик мусора в рабочих
+    # процессах не трогает их заголовки, и страницы памяти остаются общими
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from models.database import engine
+
+    # Соединения с БД, открытые мастером при импорте приложения, рабочему процессу не принадлежат.
+    # Пул процессов для расчетов запускается при старте приложения в рабочем процессе (lifespan в app.py)
+    engine.dispose(close=False)
@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float
+from sqlalchemy import create_engine, event, inspect, select, text, update, Column, Integer, String, Float, DateTime, UniqueConstraint, DDL
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import column_property, sessionmaker
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Загрузка переменных окружения
@@ -14,8 +15,11 @@ DB_HOST = os.getenv("MYSQL_HOST", "localhost")
 DB_PORT = os.getenv("MYSQL_PORT", "3306") 
 DB_NAME = os.getenv("MYSQL_DB", "haka_db")
 
-# Строка подключения к MySQL
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Строка подключения к MySQL (DATABASE_URL позволяет подставить другую БД, например SQLite для бенчмарков)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
 
 # Создание движка SQLAlchemy
 engine = create_engine(DATABASE_URL)
@@ -30,19 +34,156 @@ class FacilityModel(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     address = Column(String(255), nullable=False)
-    latitude = Column(Float, nullable=False)
-    longitude = Column(Float, nullable=False)
-    facility_type = Column(String(50), nullable=False)
+    # active_history: прежнее значение загружается и при изменении истекшего после commit атрибута -
+    # без него лента изменений записала бы новое значение вместо старого
+    latitude = column_property(Column(Float, nullable=False), active_history=True)
+    longitude = column_property(Column(Float, nullable=False), active_history=True)
+    facility_type = column_property(Column(String(50), nullable=False), active_history=True)
     city = Column(String(100), nullable=False)
     country = Column(String(100), nullable=False)
+    # Объект OSM ("node/123"), из которого загружена запись: по нему повторная выгрузка обновляет запись
+    osm_id = Column(String(32), unique=True, index=True)
+
+
+# Материализованные сводки покрытия населения по региону, типу объекта и версии данных
+class CoverageSummaryModel(Base):
+    __tablename__ = "coverage_summaries"
+    __table_args__ = (
+        UniqueConstraint("region", "facility_type", "data_version", name="uq_coverage_summary"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    region = Column(String(100), nullable=False)
+    facility_type = Column(String(50), nullable=False)
+    data_version = Column(Integer, nullable=False)
+    total_population = Column(Float, nullable=False)
+    covered_population = Column(Float, nullable=False)
+    coverage_share = Column(Float, nullable=False)
+    gaps = Column(Integer, nullable=False)
+    largest_gap_population = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Счетчики версий данных. Каждый flush с изменениями объектов увеличивает версию на 1;
+# UPDATE блокирует строку счетчика, поэтому версии фиксируются строго по порядку
+class DataVersionModel(Base):
+    __tablename__ = "data_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+FACILITIES_VERSION = "facilities"
+
+event.listen(
+    DataVersionModel.__table__,
+    "after_create",
+    DDL(f"INSERT INTO data_versions (name, version) VALUES ('{FACILITIES_VERSION}', 0)")
+)
+
+
+# Лента изменений объектов: по ней кэши обновляются инкрементально,
+# а анализ может работать со снимком данных на заданной версии
+class FacilityChangeModel(Base):
+    __tablename__ = "facility_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    version = Column(Integer, nullable=False, index=True)
+    facility_id = Column(Integer, nullable=False, index=True)
+    operation = Column(String(10), nullable=False)  # insert, update, delete
+    # Значения после изменения (для delete - пустые)
+    facility_type = Column(String(50))
+    latitude = Column(Float)
+    longitude = Column(Float)
+    # Значения до изменения (для insert - пустые)
+    old_facility_type = Column(String(50))
+    old_latitude = Column(Float)
+    old_longitude = Column(Float)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 
 # Создание таблиц в базе данных
 Base.metadata.create_all(bind=engine) # type: ignore
 
+
+def _migrate_facilities() -> None:
+    """
+    create_all не добавляет колонки в существующие таблицы - добавляем osm_id вручную
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns(FacilityModel.__tablename__)}
+    if "osm_id" in columns:
+        return
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE facilities ADD COLUMN osm_id VARCHAR(32)"))
+        for index in FacilityModel.__table__.indexes:
+            if "osm_id" in index.columns:
+                index.create(connection)
+
+
+_migrate_facilities()
+
 # Создание сессии
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _old_value(obj, attribute: str):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(obj, attribute)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def record_facility_changes(session, flush_context):
+    """
+    Записывает изменения объектов в ленту facility_changes под новой версией данных.
+    Выполняется в той же транзакции, что и сами изменения.
+    """
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, FacilityModel):
+            changes.append({
+                "facility_id": obj.id, "operation": "insert",
+                "facility_type": obj.facility_type, "latitude": obj.latitude, "longitude": obj.longitude,
+            })
+    for obj in session.dirty:
+        if isinstance(obj, FacilityModel) and session.is_modified(obj):
+            changes.append({
+                "facility_id": obj.id, "operation": "update",
+                "facility_type": obj.facility_type, "latitude": obj.latitude, "longitude": obj.longitude,
+                "old_facility_type": _old_value(obj, "facility_type"),
+                "old_latitude": _old_value(obj, "latitude"),
+                "old_longitude": _old_value(obj, "longitude"),
+            })
+    for obj in session.deleted:
+        if isinstance(obj, FacilityModel):
+            changes.append({
+                "facility_id": obj.id, "operation": "delete",
+                "old_facility_type": obj.facility_type, "old_latitude": obj.latitude, "old_longitude": obj.longitude,
+            })
+    if not changes:
+        return
+
+    versions = DataVersionModel.__table__
+    connection = session.connection()
+    result = connection.execute(
+        update(versions).where(versions.c.name == FACILITIES_VERSION).values(version=versions.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(versions.insert().values(name=FACILITIES_VERSION, version=1))
+    version = connection.execute(
+        select(versions.c.version).where(versions.c.name == FACILITIES_VERSION)
+    ).scalar()
+
+    now = datetime.utcnow()
+    connection.execute(FacilityChangeModel.__table__.insert(), [
+        {
+            "facility_type": None, "latitude": None, "longitude": None,
+            "old_facility_type": None, "old_latitude": None, "old_longitude": None,
+            **change, "version": version, "changed_at": now,
+        }
+        for change in changes
+    ])
+
+
 # Функция для получения сессии DB
 def get_db():
     db = SessionLocal()
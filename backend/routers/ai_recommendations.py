@@ -1,27 +1,36 @@
 from fastapi import APIRouter, HTTPException, Body, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import requests
 import os
 import json
 import re
+import logging
 from dotenv import load_dotenv
-import random
 import numpy as np
 from shapely.geometry import Point, Polygon
 from sqlalchemy.orm import Session
 from models.database import get_db, FacilityModel
-from constants.facilities import COVERAGE_RADIUS
+from constants.facilities import COVERAGE_RADIUS, DEFAULT_REGION, PRIORITY_ZONES
+from services.analysis_service import region_hotspots
+from services.region_service import RegionNotInherited, get_region_data, get_region_registry
+from services.scoring_service import region_scores, score_properties
+from utils.metrics import timed
+from utils.responses import GeoJSONResponse
+from utils.workers import run_in_process
 
 # Загрузка переменных окружения
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Конфигурация для прямого доступа к API OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
-    print("ВНИМАНИЕ: OPENAI_API_KEY не найден в переменных окружения!")
+    logger.warning("ВНИМАНИЕ: OPENAI_API_KEY не найден в переменных окружения!")
     # Попытка найти ключ в .env файле напрямую
     env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
     if os.path.exists(env_path):
@@ -29,7 +38,8 @@ if not OPENAI_API_KEY:
             for line in f:
                 if line.startswith('OPENAI_API_KEY='):
                     OPENAI_API_KEY = line.strip().split('=', 1)[1].strip('"\'')
-                    print(f"API ключ загружен из файла .env: {OPENAI_API_KEY[:5]}...{OPENAI_API_KEY[-4:]}")
+                    # Модуль импортируется до настройки logging в app.py: info здесь не вывелся бы
+                    logger.warning("API ключ загружен из файла .env")
                     break
 
 OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
@@ -59,6 +69,7 @@ class AIRecommendationRequest(BaseModel):
     target_facility_type: str
     recommendations_count: int = 5
     request_type: str = "optimal_placement"
+    region: str = DEFAULT_REGION
 
 class RecommendationFeature(BaseModel):
     type: str = "Feature"
@@ -85,21 +96,27 @@ async def get_ai_recommendations(
     - use_openai: Использовать ли OpenAI API (True) или локальную логику (False)
     - db: Сессия базы данных
     """
+    if request_data.region not in get_region_registry().regions:
+        raise HTTPException(status_code=404, detail=f"Регион не найден: {request_data.region}")
+
     try:
         # Получаем данные из запроса
         facility_type = request_data.target_facility_type
         area_bounds = request_data.area_information.bounds if request_data.area_information else None
         existing_facilities = request_data.existing_facilities or []
+        # Объекты из БД должны попасть в запрос - по ним строится промпт и считаются оценки
+        request_data.existing_facilities = existing_facilities
         
         # Если существующие объекты не указаны в запросе, получаем их из базы данных
         if not existing_facilities and area_bounds:
             # Получаем существующие объекты из БД на основе границ области
-            db_facilities = db.query(FacilityModel).filter(
-                FacilityModel.latitude >= area_bounds.south,
-                FacilityModel.latitude <= area_bounds.north,
-                FacilityModel.longitude >= area_bounds.west,
-                FacilityModel.longitude <= area_bounds.east
-            ).all() # type: ignore
+            with timed("db.ai_recommend.query"):
+                db_facilities = db.query(FacilityModel).filter(
+                    FacilityModel.latitude >= area_bounds.south,
+                    FacilityModel.latitude <= area_bounds.north,
+                    FacilityModel.longitude >= area_bounds.west,
+                    FacilityModel.longitude <= area_bounds.east
+                ).all() # type: ignore
             
             # Преобразуем объекты из БД в формат FacilityData
             for facility in db_facilities:
@@ -115,32 +132,42 @@ async def get_ai_recommendations(
         request_type = request_data.request_type
         
         # Логируем полученные данные
-        print(f"Received request for {count} recommendations of type {facility_type}")
-        print(f"Area bounds: {area_bounds}")
-        print(f"Existing facilities: {len(existing_facilities)} objects")
-        print(f"Request type: {request_type}")
-        print(f"Using OpenAI: {use_openai}")
+        logger.info("Received request for %s recommendations of type %s", count, facility_type)
+        logger.debug("Area bounds: %s", area_bounds)
+        logger.info("Existing facilities: %s objects", len(existing_facilities))
+        logger.debug("Request type: %s, using OpenAI: %s", request_type, use_openai)
         
+        # Промпт собирается заранее: кластеризация спроса - в пуле процессов,
+        # чтение границы региона - в пуле потоков, цикл событий не блокируется
+        hotspots = await get_demand_hotspots(request_data)
+        system_prompt = await run_in_threadpool(get_system_prompt, request_data.region)
+        user_prompt = await run_in_threadpool(format_prompt_for_ai, request_data, hotspots)
+
         # Всегда используем OpenAI API для генерации рекомендаций
-        return await get_openai_recommendations(request_data)
+        # Ответ уже провалидирован при сборке - отдаем через orjson без повторной проверки
+        recommendations = await get_openai_recommendations(request_data, system_prompt, user_prompt)
+        # Ошибка OpenAI уже записана в лог; пустой ответ с кодом 200 клиент принял бы за успех
+        if recommendations is None:
+            raise HTTPException(status_code=502, detail="Error generating AI recommendations: OpenAI request failed")
+        return GeoJSONResponse(recommendations)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating AI recommendations: {str(e)}")
 
-async def get_openai_recommendations(request_data: AIRecommendationRequest) -> AIRecommendationResponse: # type: ignore
+async def get_openai_recommendations(request_data: AIRecommendationRequest,
+                                     system_prompt: str,
+                                     user_prompt: str) -> AIRecommendationResponse: # type: ignore
     """
     Получает рекомендации от OpenAI API для размещения объектов с использованием HTTP requests
     
     Args:
         request_data: Данные запроса для генерации рекомендаций
+        system_prompt: Системный промпт (get_system_prompt)
+        user_prompt: Промпт с данными запроса (format_prompt_for_ai)
     """
     try:
-
-        
-        # Подготовка промпта для OpenAI
-        system_prompt = get_system_prompt()
-        user_prompt = format_prompt_for_ai(request_data)
-        
         # Подготовка данных для запроса
         headers = {
             "Content-Type": "application/json",
@@ -159,14 +186,15 @@ async def get_openai_recommendations(request_data: AIRecommendationRequest) -> A
         }
         
         # Отправляем запрос к API OpenAI с помощью requests
-        print("Sending request to OpenAI API...")
-        print(f"API key первые 5 символов: {OPENAI_API_KEY[:5]}...") # type: ignore
-        response = requests.post(OPENAI_API_URL, headers=headers, json=data)
+        logger.info("Sending request to OpenAI API...")
+        with timed("openai.request"):
+            # requests синхронный - запрос выполняется в пуле потоков
+            response = await run_in_threadpool(requests.post, OPENAI_API_URL, headers=headers, json=data)
         
         # Проверяем статус ответа
         if response.status_code != 200:
             error_msg = f"OpenAI API returned error: {response.status_code}, {response.text}"
-            print(error_msg)
+            logger.error(error_msg)
             
 
             
@@ -177,33 +205,31 @@ async def get_openai_recommendations(request_data: AIRecommendationRequest) -> A
         
         # Извлекаем текст из ответа
         response_text = response_data['choices'][0]['message']['content']
-        print(f"Received response from OpenAI: \n{response_text[:500]}...")
+        logger.debug("Received response from OpenAI: \n%s...", response_text[:500])
         
         # Извлекаем и форматируем рекомендации из ответа
-        return extract_recommendations_from_response(response_text, request_data)
+        with timed("openai.parse_response"):
+            features = extract_recommendations_from_response(response_text, request_data)
+        # Оценки считаются по слою населения, а не берутся из ответа модели
+        improvement_score = await score_recommendations(features, request_data)
+        return AIRecommendationResponse(features=features, improvement_score=improvement_score)
         
     except Exception as e:
-        print(f"Error in OpenAI request: {str(e)}")
+        logger.exception("Error in OpenAI request: %s", str(e))
         # Возвращаем локальные рекомендации в случае ошибки
 
-def get_system_prompt():
+def get_system_prompt(region: str = DEFAULT_REGION):
     """
-    Возвращает системный промпт для OpenAI API с учетом полигона города и данных по объектам
+    Возвращает системный промпт для OpenAI API с учетом полигона региона и данных по объектам
     """
-    city_polygon_coords = [
-        [74.575221, 42.787354],
-        [74.599471, 42.823306],
-        [74.649990, 42.795139],
-        [74.670198, 42.842571],
-        [74.763659, 42.868866],
-        [74.655547, 42.911802],
-        [74.599471, 42.953968],
-        [74.519650, 42.900700],
-        [74.421641, 42.878122],
-        [74.476203, 42.825159],
-        [74.526722, 42.824789]
-    ]
+    city_polygon_coords = get_region_registry().get(region).boundary_coordinates
     facility_weights = COVERAGE_RADIUS  # Используем радиусы как веса для алгоритма
+    # Приоритетные зоны задаются в constants.facilities.PRIORITY_ZONES
+    priority_zones = "\n".join(
+        f"   - PRIORITY UNDERDEVELOPED ZONE: {zone['coordinates']}\n"
+        f"   - THIS ZONE REQUIRES SPECIAL ATTENTION - allocate at least {zone['share']:.0%} of recommendations here"
+        for zone in PRIORITY_ZONES.get(region, [])
+    )
     return f"""CRITICAL INSTRUCTIONS - MUST BE FOLLOWED EXACTLY:
 
 1. POLYGON BOUNDARY VALIDATION:
@@ -223,8 +249,7 @@ def get_system_prompt():
    - Existing facility weights: {facility_weights}
    - Analyze coverage gaps using weighted distance
    - Minimum 500m distance between new recommendations
-   - PRIORITY UNDERDEVELOPED ZONE: {[[74.446171, 42.888538], [74.555247, 42.892399], [74.452587, 42.854614], [74.536686, 42.830083]]}
-   - THIS ZONE REQUIRES SPECIAL ATTENTION - allocate at least 40% of recommendations here
+{priority_zones}
    - Prioritize other underserved areas (especially northwestern region)
 
 4. VALIDATION CHECKLIST (verify before output):
@@ -257,9 +282,44 @@ REQUIRED OUTPUT STRUCTURE:
 FAILURE TO COMPLY WITH POLYGON BOUNDARIES WILL RESULT IN REJECTION."""
 
 
-def format_prompt_for_ai(request_data: AIRecommendationRequest):
+def get_existing_coordinates(request_data: AIRecommendationRequest) -> np.ndarray:
+    """
+    Координаты (lat, lon) существующих объектов целевого типа из запроса
+    """
+    return np.array([
+        [f.coordinates[1], f.coordinates[0]]
+        for f in (request_data.existing_facilities or [])
+        if f.type == request_data.target_facility_type and len(f.coordinates) >= 2
+    ], dtype=np.float64).reshape(-1, 2)
+
+
+async def get_demand_hotspots(request_data: AIRecommendationRequest, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Возвращает крупнейшие кластеры непокрытого населения для целевого типа объекта.
+    Кластеризация выполняется в пуле процессов, не блокируя цикл событий.
+    """
+    radius_km = COVERAGE_RADIUS.get(request_data.target_facility_type, 2)
+    existing = get_existing_coordinates(request_data)
+
+    try:
+        await run_in_threadpool(get_region_data, request_data.region)
+    except (OSError, KeyError) as e:
+        logger.warning("Population layer is not available: %s", str(e))
+        return []
+
+    with timed("ai.demand_hotspots"):
+        try:
+            return await run_in_process(region_hotspots, request_data.region, existing, radius_km, limit)
+        except RegionNotInherited:
+            # Регион загружен после запуска пула - считаем в потоке рабочего процесса
+            return await run_in_threadpool(region_hotspots, request_data.region, existing, radius_km, limit)
+
+
+def format_prompt_for_ai(request_data: AIRecommendationRequest, hotspots: List[Dict[str, Any]]):
     """
     Форматирует запрос для OpenAI API с усиленными ограничениями
+
+    :param hotspots: Кластеры непокрытого населения (get_demand_hotspots)
     """
     facility_type = request_data.target_facility_type
     area_bounds = request_data.area_information.bounds if request_data.area_information else "Not provided"
@@ -269,12 +329,7 @@ def format_prompt_for_ai(request_data: AIRecommendationRequest):
     prompt = f"""TASK: Find {count} optimal locations for {facility_type} facilities.
 
 POLYGON BOUNDARY (coordinates in [longitude, latitude]):
-{json.dumps([
-    [74.575221, 42.787354], [74.599471, 42.823306], [74.649990, 42.795139],
-    [74.670198, 42.842571], [74.763659, 42.868866], [74.655547, 42.911802],
-    [74.599471, 42.953968], [74.519650, 42.900700], [74.421641, 42.878122],
-    [74.476203, 42.825159], [74.526722, 42.824789]
-], indent=2)}
+{json.dumps(get_region_registry().get(request_data.region).boundary_coordinates, indent=2)}
 
 EXISTING FACILITIES ({len(existing_facilities)} total):
 {json.dumps([
@@ -285,12 +340,21 @@ EXISTING FACILITIES ({len(existing_facilities)} total):
     } for f in existing_facilities
 ], indent=2)}
 
+UNCOVERED DEMAND HOTSPOTS ({len(hotspots)} clusters, coordinates in [longitude, latitude]):
+{json.dumps([
+    {
+        "coordinates": [round(h["longitude"], 6), round(h["latitude"], 6)],
+        "population": round(h["population"])
+    } for h in hotspots
+], indent=2)}
+
 MANDATORY REQUIREMENTS:
 1. ALL {count} coordinates MUST be STRICTLY INSIDE the polygon boundary
 2. Minimum 500m spacing between recommendations
 3. Response format: ONLY valid GeoJSON FeatureCollection
 4. NO explanatory text outside GeoJSON
 5. Prioritize coverage gaps and underserved areas
+6. Prefer locations close to the uncovered demand hotspots with the largest population
 
 VERIFY EACH COORDINATE IS INSIDE POLYGON BEFORE FINALIZING RESPONSE.
 
@@ -299,9 +363,9 @@ Expected response: Valid GeoJSON with {count} Point features."""
     return prompt
 
 
-def extract_recommendations_from_response(response_text, request_data: AIRecommendationRequest):
+def extract_recommendations_from_response(response_text, request_data: AIRecommendationRequest) -> List[Dict[str, Any]]:
     """
-    Извлекает рекомендации из ответа OpenAI и форматирует их в AIRecommendationResponse
+    Извлекает рекомендации из ответа OpenAI и форматирует их в GeoJSON Feature (без оценок)
     """
     # Шаг 1: Поиск блоков JSON с различными форматами обрамления
     json_patterns = [
@@ -445,8 +509,7 @@ def extract_recommendations_from_response(response_text, request_data: AIRecomme
                             "properties": {
                                 "name": name,
                                 "type": "recommendation",
-                                "reason": reason,
-                                "score": 0.85 + (random.random() * 0.1)
+                                "reason": reason
                             }
                         }
                         features.append(feature)
@@ -481,15 +544,48 @@ def extract_recommendations_from_response(response_text, request_data: AIRecomme
             
         if "reason" not in feature["properties"]:
             feature["properties"]["reason"] = "Оптимальное расположение определено AI"
-            
-        if "score" not in feature["properties"]:
-            feature["properties"]["score"] = 0.8 + (random.random() * 0.15)  # Случайный скор 0.8-0.95
     
-    # Рассчитываем средний показатель улучшения
-    avg_score = sum([feature["properties"].get("score", 0.8) for feature in features]) / len(features) if features else 0.8
-    improvement_score = 60 + avg_score * 30  # Масштабируем скор в диапазоне 60-90
-    
-    return AIRecommendationResponse(
-        features=features,
-        improvement_score=improvement_score
+    return features
+
+
+async def score_recommendations(features: List[Dict[str, Any]], request_data: AIRecommendationRequest) -> float:
+    """
+    Проставляет рекомендациям реальные показатели: население без покрытия в радиусе,
+    перекрытие с существующим покрытием и расстояние до ближайшего объекта.
+    Оценка выполняется в пуле процессов, не блокируя цикл событий.
+
+    :return: Доля непокрытого сейчас населения, которую покроют все рекомендации вместе (0-100)
+    """
+    candidates = []
+    scored = []
+    for feature in features:
+        try:
+            lon, lat = feature["geometry"]["coordinates"][:2]
+            candidates.append([float(lat), float(lon)])
+            scored.append(feature)
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not candidates:
+        return 0.0
+
+    try:
+        await run_in_threadpool(get_region_data, request_data.region)
+    except (OSError, KeyError) as e:
+        logger.warning("Population layer is not available: %s", str(e))
+        return 0.0
+
+    args = (
+        request_data.region,
+        np.array(candidates, dtype=np.float64),
+        get_existing_coordinates(request_data),
+        COVERAGE_RADIUS.get(request_data.target_facility_type, 2),
     )
+    with timed("ai.score_recommendations"):
+        try:
+            scores = await run_in_process(region_scores, *args)
+        except RegionNotInherited:
+            # Регион загружен после запуска пула - считаем в потоке рабочего процесса
+            scores = await run_in_threadpool(region_scores, *args)
+    for i, feature in enumerate(scored):
+        feature["properties"].update(score_properties(scores, i))
+    return scores["improvement_score"]
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from models.database import get_db
+from constants.facilities import ASSIGNMENT_REACH_FACTOR, COVERAGE_RADIUS, DEFAULT_REGION, FACILITY_CAPACITY
+from services.capacity_service import region_load
+from services.region_service import RegionNotInherited, get_region_data
+from services.version_service import load_snapshot, resolve_version
+from utils.metrics import timed
+from utils.responses import GeoJSONResponse
+from utils.workers import run_in_process
+
+router = APIRouter()
+
+
+class CapacityLoadResponse(BaseModel):
+    type: str = "FeatureCollection"
+    features: List[Dict[str, Any]]
+    hotspots: List[Dict[str, Any]]
+    summary: Dict[str, float]
+    data_version: int
+    region: str
+
+
+@router.get("/capacity/load", response_model=CapacityLoadResponse, tags=["capacity"])
+async def get_capacity_load(
+    facility_type: str = Query(..., description="Тип объекта"),
+    capacity: Optional[float] = Query(None, description="Вместимость одного объекта; по умолчанию из FACILITY_CAPACITY"),
+    version: Optional[int] = Query(None, description="Версия данных (снимок); по умолчанию - текущая"),
+    region: str = Query(DEFAULT_REGION, description="Регион"),
+    db: Session = Depends(get_db)
+):
+    """
+    Распределяет жителей по объектам с учетом вместимости и возвращает нагрузку каждого объекта,
+    а также зоны, жителям которых не хватило мест в радиусе охвата.
+    Распределение считается в пуле процессов, не блокируя цикл событий.
+    """
+    if facility_type not in COVERAGE_RADIUS:
+        raise HTTPException(status_code=400, detail=f"Неизвестный тип объекта: {facility_type}")
+    capacity = FACILITY_CAPACITY[facility_type] if capacity is None else capacity
+    radius_km = COVERAGE_RADIUS[facility_type]
+
+    try:
+        region_data = await run_in_threadpool(get_region_data, region)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Регион не найден: {region}")
+    try:
+        version = await run_in_threadpool(resolve_version, db, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    snapshot = await run_in_threadpool(load_snapshot, db, version, [facility_type])
+
+    # Объекты региона и его окрестности (к ним могут уйти жители с окраин)
+    ids = np.array(sorted(snapshot), dtype=np.int64)
+    facilities = np.array(
+        [(snapshot[i]["latitude"], snapshot[i]["longitude"]) for i in ids.tolist()], dtype=np.float64
+    ).reshape(-1, 2)
+    in_region = region_data.region.bbox_mask(facilities, radius_km * ASSIGNMENT_REACH_FACTOR)
+    ids, facilities = ids[in_region].tolist(), facilities[in_region]
+
+    with timed("capacity.load"):
+        try:
+            assignment, hotspots = await run_in_process(region_load, region, facilities, capacity, radius_km)
+        except RegionNotInherited:
+            # Регион загружен после запуска пула - считаем в потоке рабочего процесса
+            assignment, hotspots = await run_in_threadpool(region_load, region, facilities, capacity, radius_km)
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+            "properties": {
+                "id": facility_id,
+                "facility_type": facility_type,
+                "capacity": float(assignment["capacity"][i]),
+                "load": float(assignment["load"][i]),
+                "utilization": float(assignment["utilization"][i]),
+                "demand_pressure": float(assignment["demand_pressure"][i]),
+                "mean_distance_km": float(assignment["mean_distance_km"][i]),
+                "overloaded": bool(assignment["demand_pressure"][i] > 1),
+            },
+        }
+        for i, (facility_id, (latitude, longitude)) in enumerate(zip(ids, facilities.tolist()))
+    ]
+    total = assignment["total_population"]
+    return GeoJSONResponse({
+        "type": "FeatureCollection",
+        "features": features,
+        "hotspots": hotspots,
+        "summary": {
+            "total_population": total,
+            "served_population": assignment["served_population"],
+            "served_share": assignment["served_population"] / total if total else 0.0,
+            "overflow_population": float(assignment["overflow"].sum()),
+            "overloaded_facilities": float((assignment["demand_pressure"] > 1).sum()),
+        },
+        "data_version": version,
+        "region": region,
+    })
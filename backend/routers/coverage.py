@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from models.database import get_db
+from constants.facilities import COVERAGE_RADIUS, DEFAULT_REGION
+from services.coverage_service import get_coverage_service
+
+router = APIRouter()
+
+
+class CoverageSummary(BaseModel):
+    region: str
+    facility_type: str
+    data_version: int
+    total_population: float
+    covered_population: float
+    coverage_share: float
+    gaps: int
+    largest_gap_population: float
+
+
+@router.get("/coverage/summary", response_model=List[CoverageSummary], tags=["coverage"])
+def get_coverage_summary(
+    facility_type: Optional[str] = Query(None, description="Тип объекта; по умолчанию - все типы"),
+    region: str = Query(DEFAULT_REGION, description="Регион"),
+    version: Optional[int] = Query(None, description="Версия данных (снимок); по умолчанию - текущая"),
+    db: Session = Depends(get_db)
+):
+    """
+    Сводка покрытия населения по типам объектов: охваченное население, доля и количество зон без покрытия.
+    Сводки материализованы по версии данных и пересчитываются только после изменения объектов этого типа.
+    """
+    if facility_type is not None and facility_type not in COVERAGE_RADIUS:
+        raise HTTPException(status_code=400, detail=f"Неизвестный тип объекта: {facility_type}")
+
+    try:
+        service = get_coverage_service(region)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Регион не найден: {region}")
+    try:
+        return service.refresh(db, [facility_type] if facility_type else None, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,15 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from models.facility import Facility, FacilityCreate
-from models.database import get_db, FacilityModel
+from models.database import get_db, FacilityModel, SessionLocal
+from constants.facilities import COVERAGE_RADIUS
+from services.region_service import get_region_registry
+from services.version_service import change_to_dict, changes_between, current_version
+from utils.metrics import timed
+from utils.responses import COORDINATE_PRECISION, ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Колонки, которые отдаются в списках объектов (совпадают с полями модели Facility)
+FACILITY_COLUMNS = (
+    FacilityModel.id,
+    FacilityModel.name,
+    FacilityModel.address,
+    FacilityModel.latitude,
+    FacilityModel.longitude,
+    FacilityModel.facility_type,
+    FacilityModel.city,
+    FacilityModel.country,
+)
+
+
+def facilities_response(query, span: str) -> ORJSONResponse:
+    """
+    Выбирает только нужные колонки и сериализует их через orjson.
+    Данные из БД доверенные, поэтому повторная валидация через response_model не нужна.
+    """
+    with timed(span):
+        rows = query.with_entities(*FACILITY_COLUMNS).all()
+    keys = [column.key for column in FACILITY_COLUMNS]
+    return ORJSONResponse([dict(zip(keys, row)) for row in rows], precision=COORDINATE_PRECISION)
+
 
 @router.post("/facilities/", response_model=Facility, tags=["facilities"])
-def create_facility(facility: FacilityCreate, db: Session = Depends(get_db)):
+def create_facility(facility: FacilityCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     Создание нового объекта инфраструктуры.
     """
@@ -26,9 +58,94 @@ def create_facility(facility: FacilityCreate, db: Session = Depends(get_db)):
     db.add(db_facility)
     db.commit()
     db.refresh(db_facility)
+
+    background_tasks.add_task(refresh_coverage, [facility.facility_type])
+    return db_facility
+
+
+def refresh_coverage(facility_types: List[str]) -> None:
+    """
+    Инкрементально обновляет материализованные сводки покрытия для затронутых типов
+    в уже загруженных регионах (остальные пересчитаются по запросу).
+    Выполняется фоном после ответа: запись уже зафиксирована, и ошибка пересчета
+    (например, нет слоя населения) только записывается в лог - get_summary досчитает сводку сам.
+    """
+    types = [t for t in dict.fromkeys(facility_types) if t in COVERAGE_RADIUS]
+    if not types:
+        return
+    db = SessionLocal()
+    try:
+        for region_data in get_region_registry().loaded():
+            region_data.coverage.refresh(db, types)
+    except Exception:
+        logger.exception("Coverage refresh failed for %s", ", ".join(types))
+    finally:
+        db.close()
+
+
+@router.put("/facilities/{facility_id}", response_model=Facility, tags=["facilities"])
+def update_facility(facility_id: int, facility: FacilityCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    Обновление объекта. Изменение попадает в ленту изменений под новой версией данных.
+    """
+    db_facility = db.query(FacilityModel).filter(FacilityModel.id == facility_id).first()# type: ignore
+    if db_facility is None:
+        raise HTTPException(status_code=404, detail="Объект не найден")
+
+    old_type = db_facility.facility_type
+    for field in ("name", "address", "latitude", "longitude", "facility_type", "city", "country"):
+        setattr(db_facility, field, getattr(facility, field))
+    db.commit()
+    db.refresh(db_facility)
+
+    background_tasks.add_task(refresh_coverage, [old_type, facility.facility_type])
     return db_facility
 
 
+@router.delete("/facilities/{facility_id}", response_model=Facility, tags=["facilities"])
+def delete_facility(facility_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    Удаление объекта. Прежние координаты сохраняются в ленте изменений,
+    поэтому анализ на более раннюю версию данных по-прежнему возможен.
+    """
+    db_facility = db.query(FacilityModel).filter(FacilityModel.id == facility_id).first()# type: ignore
+    if db_facility is None:
+        raise HTTPException(status_code=404, detail="Объект не найден")
+
+    deleted = {column.key: getattr(db_facility, column.key) for column in FACILITY_COLUMNS}
+    db.delete(db_facility)
+    db.commit()
+
+    background_tasks.add_task(refresh_coverage, [deleted["facility_type"]])
+    return deleted
+
+
+@router.get("/facilities/changes", tags=["facilities"])
+def get_facility_changes(
+    since: int = Query(0, description="Вернуть изменения с версией больше since"),
+    limit: int = Query(1000, ge=1, le=10000, description="Максимальное количество изменений"),
+    db: Session = Depends(get_db)
+):
+    """
+    Лента изменений объектов (вставка, обновление, удаление) и текущая версия данных.
+    Клиенты с кэшем запрашивают только изменения после своей версии.
+    """
+    version = current_version(db)
+    changes = changes_between(db, since, version, limit=limit + 1)
+    next_since = version
+    if len(changes) > limit:
+        # Обрезаем по границе версии, чтобы изменения одной версии не разделились между страницами
+        last = changes[limit].version
+        page = [change for change in changes[:limit] if change.version < last]
+        changes = page or changes_between(db, since, last)
+        next_since = changes[-1].version
+    return {
+        "version": version,
+        "changes": [change_to_dict(change) for change in changes],
+        "next_since": next_since,
+    }
+
+
 @router.get("/facilities/", response_model=List[Facility], tags=["facilities"])
 def get_facilities(
     min_lat: Optional[float] = Query(None, description="Минимальная широта"),
@@ -61,8 +178,7 @@ def get_facilities(
     if country is not None:
         query = query.filter(FacilityModel.country == country)# type: ignore
     
-    facilities = query.all()
-    return facilities
+    return facilities_response(query, "db.facilities.query")
 
 
 @router.get("/facilities/{facility_id}", response_model=Facility, tags=["facilities"])
@@ -100,5 +216,4 @@ def get_facilities_by_type(
     if max_lon is not None:
         query = query.filter(FacilityModel.longitude <= max_lon)
     
-    facilities = query.all()
-    return facilities
+    return facilities_response(query, "db.facilities_by_type.query")
@@ -0,0 +1,173 @@
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from models.database import get_db
+from constants.facilities import (
+    ASSIGNMENT_REACH_FACTOR, COVERAGE_RADIUS, DEFAULT_REGION, DISTANCE_DECAY_TYPES, PLACEMENT_OBJECTIVES, PRIORITY_ZONES
+)
+from services.placement_service import PlacementService
+from services.region_service import get_region_data
+from services.scoring_service import score_candidates, score_properties
+from services.version_service import resolve_version, snapshot_coordinates
+from utils.metrics import timed
+from utils.responses import GeoJSONResponse
+
+router = APIRouter()
+
+
+def get_placement_service(region: str = DEFAULT_REGION) -> PlacementService:
+    """
+    Сервис размещения региона: слой населения и индексы общие для всех запросов, пока регион загружен
+    """
+    try:
+        return get_region_data(region).placement
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Регион не найден: {region}")
+
+
+class PlacementPlanRequest(BaseModel):
+    region: str = DEFAULT_REGION
+    facility_types: Optional[List[str]] = None  # По умолчанию - все типы из COVERAGE_RADIUS
+    recommendations_count: int = 5
+    use_hotspots: bool = False  # Кандидаты - центроиды кластеров непокрытого спроса вместо всех гексагонов
+    objective: str = "coverage"  # coverage, p_median или min_max
+    distance_decay: str = "step"  # step, linear, exponential или gaussian
+    use_priority_zones: bool = False  # Учитывать приоритетные зоны региона (PRIORITY_ZONES)
+    priority_weight: Optional[float] = None  # Множитель веса жителей приоритетных зон вместо заданного в зоне
+    cell_weights: Optional[Dict[str, float]] = None  # Индекс H3 -> множитель (демографические веса)
+    use_capacity: bool = False  # Кандидаты - зоны, где существующим объектам не хватает вместимости
+    version: Optional[int] = None  # Версия данных (снимок); по умолчанию - текущая
+
+
+class PlacementPlanResponse(BaseModel):
+    type: str = "FeatureCollection"
+    features: List[Dict[str, Any]]
+    scores: Dict[str, Dict[str, float]]
+    data_version: int
+
+
+class CandidateScoreRequest(BaseModel):
+    region: str = DEFAULT_REGION
+    facility_type: str
+    candidates: List[List[float]]  # Точки в формате [longitude, latitude]
+    version: Optional[int] = None  # Версия данных (снимок); по умолчанию - текущая
+
+
+class CandidateScoreResponse(BaseModel):
+    type: str = "FeatureCollection"
+    features: List[Dict[str, Any]]
+    improvement_score: float
+    data_version: int
+
+
+@router.post("/placement/plan", response_model=PlacementPlanResponse, tags=["placement"])
+async def plan_placement(
+    request_data: PlacementPlanRequest = Body(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Подбирает места для нескольких типов объектов за один запрос.
+    Население и существующие объекты загружаются один раз, типы решаются параллельно
+    в пуле процессов, поэтому цикл событий рабочего процесса не блокируется.
+    """
+    facility_types = request_data.facility_types or list(COVERAGE_RADIUS)
+    unknown = [t for t in facility_types if t not in COVERAGE_RADIUS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные типы объектов: {', '.join(unknown)}")
+    if request_data.objective not in PLACEMENT_OBJECTIVES:
+        raise HTTPException(status_code=400, detail=f"Неизвестная целевая функция: {request_data.objective}")
+    if request_data.distance_decay not in DISTANCE_DECAY_TYPES:
+        raise HTTPException(status_code=400, detail=f"Неизвестная функция затухания: {request_data.distance_decay}")
+
+    # Все типы берутся из одного снимка данных - параллельные изменения объектов на результат не влияют
+    try:
+        version = await run_in_threadpool(resolve_version, db, request_data.version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    with timed("db.placement.query"):
+        facilities_by_type = await run_in_threadpool(snapshot_coordinates, db, version, facility_types)
+
+    service = await run_in_threadpool(get_placement_service, request_data.region)
+    # Веса - массив по гексагонам; геометрия зон и матрицы расстояний при их смене не пересчитываются
+    weights = None
+    if request_data.use_priority_zones or request_data.cell_weights:
+        weights = service.weights.build(
+            PRIORITY_ZONES.get(request_data.region, []) if request_data.use_priority_zones else (),
+            priority_weight=request_data.priority_weight,
+            cell_weights=request_data.cell_weights,
+        )
+
+    with timed("placement.plan"):
+        results = await service.plan_async(
+            facilities_by_type,
+            count=request_data.recommendations_count,
+            use_hotspots=request_data.use_hotspots,
+            objective=request_data.objective,
+            decay=request_data.distance_decay,
+            weights=weights,
+            use_capacity=request_data.use_capacity,
+        )
+    # Результат собран сервисом, поэтому отдаем его без повторной валидации pydantic
+    return GeoJSONResponse({**service.to_feature_collection(results), "data_version": version})
+
+
+@router.post("/placement/score", response_model=CandidateScoreResponse, tags=["placement"])
+def score_placement_candidates(
+    request_data: CandidateScoreRequest = Body(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Оценивает любые точки-кандидаты (от AI, пользователя или алгоритма размещения):
+    население без покрытия в радиусе, перекрытие с существующим покрытием
+    и расстояние до ближайшего объекта того же типа.
+    """
+    facility_type = request_data.facility_type
+    if facility_type not in COVERAGE_RADIUS:
+        raise HTTPException(status_code=400, detail=f"Неизвестный тип объекта: {facility_type}")
+    if any(len(point) < 2 for point in request_data.candidates):
+        raise HTTPException(status_code=400, detail="Каждая точка должна быть в формате [longitude, latitude]")
+
+    candidates = np.array(
+        [[point[1], point[0]] for point in request_data.candidates], dtype=np.float64
+    ).reshape(-1, 2)
+
+    try:
+        version = resolve_version(db, request_data.version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    with timed("db.placement.query"):
+        facilities = snapshot_coordinates(db, version, [facility_type])[facility_type]
+
+    try:
+        region_data = get_region_data(request_data.region)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Регион не найден: {request_data.region}")
+    coverage_service = region_data.coverage
+    radius_km = COVERAGE_RADIUS[facility_type]
+    # Объекты региона и его окрестности - так же, как в /capacity/load
+    facilities = facilities[region_data.region.bbox_mask(facilities, radius_km * ASSIGNMENT_REACH_FACTOR)]
+    covered = coverage_service.covered_mask(db, facility_type, version)
+    with timed("placement.score"):
+        scores = score_candidates(
+            coverage_service.layer, candidates, facilities, radius_km, covered=covered
+        )
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(lon), float(lat)]},
+            "properties": {"facility_type": facility_type, **score_properties(scores, i)},
+        }
+        for i, (lat, lon) in enumerate(candidates)
+    ]
+    return GeoJSONResponse({
+        "type": "FeatureCollection",
+        "features": features,
+        "improvement_score": scores["improvement_score"],
+        "data_version": version,
+    })
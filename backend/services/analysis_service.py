@@ -2,33 +2,50 @@ import geopandas as gpd
 import pandas as pd
 import numpy as np
 from shapely.geometry import Point, LineString
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import osmnx as ox
 from sklearn.cluster import DBSCAN
 import h3
 from rtree import index
 
+from services.population_service import PopulationLayer
+from services.region_service import get_region_data
+from utils.projection import geodesic_buffers, local_metric_crs, to_metric, from_metric
+from utils.metrics import timed
+
 class AnalysisService:
     def __init__(self):
         pass
     
     def calculate_access_areas(self, 
                               facilities: gpd.GeoDataFrame, 
-                              max_distance: float = 5000) -> gpd.GeoDataFrame:
+                              max_distance: float = 5000,
+                              crs: Optional[str] = None) -> gpd.GeoDataFrame:
         """
         Рассчитывает зоны доступности вокруг существующих учреждений
         
         :param facilities: GeoDataFrame с учреждениями
         :param max_distance: Максимальное расстояние в метрах
+        :param crs: Метрическая СК региона (Region.crs) для буферов полигонов; по умолчанию - локальная по охвату объектов
         :return: GeoDataFrame с буферными зонами
         """
-        # Проецируем в метрическую СК для расчета буферов
-        facilities_proj = facilities.to_crs(epsg=3857)
-        
-        # Создаем буферы
-        buffers = facilities_proj.geometry.buffer(max_distance)
-        
-        # Возвращаем результат в WGS84
+        if len(facilities) == 0:
+            return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+
+        geometry = facilities.geometry
+        if facilities.crs is not None and not facilities.crs.equals("EPSG:4326"):
+            geometry = geometry.to_crs(epsg=4326)
+
+        # Для точек строим геодезические круги напрямую по массивам координат
+        if (geometry.geom_type == "Point").all():
+            buffers = geodesic_buffers(geometry.x.values, geometry.y.values, max_distance)
+            return gpd.GeoDataFrame(geometry=buffers, crs="EPSG:4326")
+
+        # Для полигонов - буфер в метрической проекции региона
+        if crs is None:
+            minx, miny, maxx, maxy = geometry.total_bounds
+            crs = local_metric_crs((minx + maxx) / 2, (miny + maxy) / 2)
+        buffers = geometry.to_crs(crs).buffer(max_distance)
         return gpd.GeoDataFrame(geometry=buffers).to_crs(epsg=4326)
     
     def find_underserved_areas(self, 
@@ -43,9 +60,11 @@ class AnalysisService:
         """
         # Объединяем все буферы
         if len(access_areas) > 0:
-            all_buffers = access_areas.unary_union
+            with timed("geometry.unary_union"):
+                all_buffers = access_areas.unary_union
             # Находим разницу между изучаемой областью и буферами
-            underserved = study_area.geometry.difference(all_buffers)
+            with timed("geometry.difference"):
+                underserved = study_area.geometry.difference(all_buffers)
             return gpd.GeoDataFrame(geometry=underserved)
         else:
             return study_area.copy()
@@ -63,24 +82,26 @@ class AnalysisService:
         :return: Процент улучшения (0-100)
         """
         # Объединяем старые и новые зоны
-        if len(old_access_areas) > 0:
-            old_union = old_access_areas.unary_union
-        else:
-            old_union = None
-            
-        new_union = new_access_areas.unary_union
+        with timed("geometry.unary_union"):
+            if len(old_access_areas) > 0:
+                old_union = old_access_areas.unary_union
+            else:
+                old_union = None
+                
+            new_union = new_access_areas.unary_union
         
         # Считаем население в каждой зоне
         pop_count = len(population)
         if pop_count == 0:
             return 0
             
-        if old_union:
-            old_pop_covered = sum(population.geometry.within(old_union))
-        else:
-            old_pop_covered = 0
-            
-        new_pop_covered = sum(population.geometry.within(new_union))
+        with timed("geometry.within"):
+            if old_union:
+                old_pop_covered = sum(population.geometry.within(old_union))
+            else:
+                old_pop_covered = 0
+                
+            new_pop_covered = sum(population.geometry.within(new_union))
         
         # Вычисляем улучшение
         if old_pop_covered == pop_count:
@@ -88,3 +109,98 @@ class AnalysisService:
         else:
             improvement = (new_pop_covered - old_pop_covered) / (pop_count - old_pop_covered) * 100
             return max(0, min(100, improvement))
+
+    def find_demand_hotspots(self,
+                             layer: PopulationLayer,
+                             covered: Optional[np.ndarray] = None,
+                             eps: float = 1200,
+                             min_population: int = 2000,
+                             max_radius: Optional[float] = None,
+                             demand: Optional[np.ndarray] = None,
+                             crs: Optional[str] = None) -> List[Dict]:
+        """
+        Кластеризует непокрытые гексагоны с учетом населения (DBSCAN в метрической СК)
+
+        :param layer: Слой населения
+        :param covered: Булева маска уже покрытых гексагонов
+        :param eps: Радиус соседства в метрах
+        :param min_population: Минимальное население ядра кластера
+        :param max_radius: Если задан, крупные кластеры делятся на части радиусом не более max_radius метров
+        :param demand: Спрос по гексагонам вместо населения (например, необслуженный из-за перегрузки объектов)
+        :param crs: Метрическая СК региона (Region.crs); по умолчанию - локальная по охвату гексагонов
+        :return: Список кластеров (центроид, население, число гексагонов), по убыванию населения
+        """
+        demand = layer.population if demand is None else demand
+        mask = demand > 0
+        if covered is not None:
+            mask &= ~covered
+        if not mask.any():
+            return []
+
+        lat, lon, weights = layer.lat[mask], layer.lon[mask], demand[mask]
+
+        # Метрическая проекция региона - расстояния в метрах
+        x, y, crs = to_metric(lon, lat, crs=crs)
+        xy = np.column_stack([x, y])
+
+        with timed("analysis.dbscan"):
+            labels = DBSCAN(eps=eps, min_samples=int(min_population), algorithm="ball_tree").fit(
+                xy, sample_weight=weights
+            ).labels_
+
+        clustered = labels >= 0
+        if not clustered.any():
+            return []
+
+        # Сплошная застройка дает один большой кластер - режем его на квадраты,
+        # вписанные в круг радиуса max_radius
+        keys = labels[clustered].reshape(-1, 1)
+        if max_radius:
+            tile = max_radius * np.sqrt(2)
+            keys = np.column_stack([
+                keys[:, 0],
+                np.floor(xy[clustered, 0] / tile),
+                np.floor(xy[clustered, 1] / tile),
+            ])
+
+        # Взвешенные по населению центроиды кластеров
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        ids = groups[:, 0].astype(int)
+        w = weights[clustered]
+        pop = np.bincount(inverse, weights=w)
+        cx = np.bincount(inverse, weights=xy[clustered, 0] * w) / pop
+        cy = np.bincount(inverse, weights=xy[clustered, 1] * w) / pop
+        cells = np.bincount(inverse)
+        c_lon, c_lat = from_metric(cx, cy, crs)
+
+        order = np.argsort(-pop)
+        return [
+            {
+                "cluster": int(ids[i]),
+                "latitude": float(c_lat[i]),
+                "longitude": float(c_lon[i]),
+                "population": float(pop[i]),
+                "cells": int(cells[i]),
+            }
+            for i in order
+        ]
+
+
+def region_hotspots(region: str, existing: np.ndarray, radius_km: float, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Крупнейшие кластеры населения региона вне радиуса существующих объектов.
+    Точка входа для пула процессов: слой населения берется из реестра регионов процесса.
+
+    :param region: Ключ региона
+    :param existing: Массив (N, 2) координат существующих объектов (lat, lon)
+    :param radius_km: Радиус охвата в км
+    :param limit: Сколько кластеров вернуть (по умолчанию все)
+    """
+    data = get_region_data(region)
+    layer = data.layer
+    covered = layer.covered_mask(existing[:, 0], existing[:, 1], radius_km)
+    hotspots = AnalysisService().find_demand_hotspots(
+        layer, covered=covered, max_radius=radius_km * 1000, crs=data.region.crs
+    )
+    return hotspots[:limit]
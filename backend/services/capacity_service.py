@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from constants.facilities import ASSIGNMENT_REACH_FACTOR
+from services.analysis_service import AnalysisService
+from services.population_service import EARTH_RADIUS_KM, PopulationLayer, km_to_radians
+from services.region_service import get_region_data
+
+
+def assign_demand(layer: PopulationLayer,
+                  facilities: np.ndarray,
+                  capacity: Union[float, np.ndarray],
+                  radius_km: float,
+                  reach_km: Optional[float] = None) -> Dict:
+    """
+    Распределяет население гексагонов по объектам с учетом их вместимости.
+
+    Аукцион по раундам на разреженной матрице расстояний: каждый гексагон с нераспределенным
+    населением обращается к ближайшему объекту, у которого еще есть места; объект принимает
+    обращения по возрастанию расстояния, пока не заполнится. Гексагон, которому не хватило
+    мест, переходит к следующему объекту. Раундов не больше, чем объектов в радиусе гексагона.
+
+    :param layer: Слой населения
+    :param facilities: Массив (N, 2) координат объектов (lat, lon)
+    :param capacity: Вместимость объекта (число или массив из N значений)
+    :param radius_km: Радиус охвата в км - жители дальше считаются необслуженными
+    :param reach_km: Наибольшее расстояние до объекта при распределении (по умолчанию radius_km * ASSIGNMENT_REACH_FACTOR)
+    :return: Нагрузка объектов и необслуженный спрос по гексагонам
+    """
+    population = layer.population.astype(np.float64)
+    n_facilities = len(facilities)
+    capacity = np.broadcast_to(np.asarray(capacity, dtype=np.float64), (n_facilities,)).copy()
+    reach_km = radius_km * ASSIGNMENT_REACH_FACTOR if reach_km is None else reach_km
+
+    if n_facilities == 0:
+        return {
+            "load": np.zeros(0),
+            "capacity": capacity,
+            "utilization": np.zeros(0),
+            "demand_pressure": np.zeros(0),
+            "mean_distance_km": np.zeros(0),
+            "overflow": population.copy(),
+            "total_population": float(population.sum()),
+            "served_population": 0.0,
+            "assigned_population": 0.0,
+        }
+
+    # Разреженная матрица "гексагон - объект" в плоском виде, объекты отсортированы по расстоянию
+    tree = BallTree(np.radians(facilities), metric="haversine")
+    indices, distances = tree.query_radius(
+        layer.coords_rad, r=km_to_radians(reach_km), return_distance=True, sort_results=True
+    )
+    lengths = np.fromiter((len(i) for i in indices), dtype=np.int64, count=len(indices))
+    pair_facility = np.concatenate(indices).astype(np.int64)
+    pair_distance = np.concatenate(distances) * EARTH_RADIUS_KM
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    remaining = population.copy()
+    capacity_left = capacity.copy()
+    pointer = np.zeros(len(population), dtype=np.int64)
+    assigned_cells, assigned_pairs, assigned_amounts = [], [], []
+
+    while True:
+        active = np.flatnonzero((remaining > 0) & (pointer < lengths))
+        if not active.size:
+            break
+        pairs = offsets[active] + pointer[active]
+        facility = pair_facility[pairs]
+
+        # Заполненные объекты пропускаем без торгов
+        full = capacity_left[facility] <= 0
+        pointer[active[full]] += 1
+        active, pairs, facility = active[~full], pairs[~full], facility[~full]
+        if not active.size:
+            continue
+
+        # Внутри каждого объекта обращения принимаются по возрастанию расстояния
+        order = np.lexsort((pair_distance[pairs], facility))
+        active, pairs, facility = active[order], pairs[order], facility[order]
+        demand = remaining[active]
+        before = np.cumsum(demand) - demand
+        group_start = np.concatenate([[True], facility[1:] != facility[:-1]])
+        before -= before[group_start][np.cumsum(group_start) - 1]
+        accepted = np.clip(capacity_left[facility] - before, 0.0, demand)
+
+        remaining[active] -= accepted
+        remaining[remaining < 1e-9] = 0.0
+        capacity_left -= np.bincount(facility, weights=accepted, minlength=n_facilities)
+        taken = accepted > 0
+        assigned_cells.append(active[taken])
+        assigned_pairs.append(pairs[taken])
+        assigned_amounts.append(accepted[taken])
+        # Кому не хватило мест - к следующему по удаленности объекту
+        pointer[active[remaining[active] > 0]] += 1
+
+    cells = np.concatenate(assigned_cells) if assigned_cells else np.empty(0, dtype=np.int64)
+    pairs = np.concatenate(assigned_pairs) if assigned_pairs else np.empty(0, dtype=np.int64)
+    amounts = np.concatenate(assigned_amounts) if assigned_amounts else np.empty(0)
+    facility, distance = pair_facility[pairs], pair_distance[pairs]
+
+    load = np.bincount(facility, weights=amounts, minlength=n_facilities)
+    within = distance <= radius_km
+    served = np.bincount(cells[within], weights=amounts[within], minlength=len(population))
+
+    # Нагрузка без ограничения вместимости: все жители идут к ближайшему объекту
+    has_facility = lengths > 0
+    pressure = np.bincount(
+        pair_facility[offsets[has_facility]], weights=population[has_facility], minlength=n_facilities
+    )
+
+    return {
+        "load": load,
+        "capacity": capacity,
+        "utilization": np.divide(load, capacity, out=np.zeros_like(load), where=capacity > 0),
+        "demand_pressure": np.divide(pressure, capacity, out=np.zeros_like(pressure), where=capacity > 0),
+        "mean_distance_km": np.divide(
+            np.bincount(facility, weights=amounts * distance, minlength=n_facilities), load,
+            out=np.zeros_like(load), where=load > 0
+        ),
+        "overflow": np.clip(population - served, 0.0, None),
+        "total_population": float(population.sum()),
+        "served_population": float(served.sum()),
+        "assigned_population": float(amounts.sum()),
+    }
+
+
+def overload_hotspots(layer: PopulationLayer,
+                      assignment: Dict,
+                      radius_km: float,
+                      crs: Optional[str] = None) -> List[Dict]:
+    """
+    Кластеры жителей, которых не удалось обслужить в радиусе охвата из-за нехватки мест или расстояния
+
+    :param crs: Метрическая СК региона (Region.crs)
+    """
+    return AnalysisService().find_demand_hotspots(
+        layer, demand=assignment["overflow"], max_radius=radius_km * 1000, crs=crs
+    )
+
+
+def region_load(region: str, facilities: np.ndarray, capacity: float, radius_km: float) -> Tuple[Dict, List[Dict]]:
+    """
+    Нагрузка объектов и зоны перегрузки для региона.
+    Точка входа для пула процессов: слой населения берется из реестра регионов процесса.
+    """
+    data = get_region_data(region)
+    assignment = assign_demand(data.layer, facilities, capacity, radius_km)
+    return assignment, overload_hotspots(data.layer, assignment, radius_km, data.region.crs)
@@ -0,0 +1,123 @@
+"""
+Колоночное хранилище слоя населения в виде .npy-файлов.
+
+Файлы открываются через np.load(mmap_mode="r"): несколько процессов uvicorn
+разделяют одни и те же страницы в page cache вместо собственных копий данных.
+Объекты инфраструктуры здесь не хранятся: их источник - таблица facilities с лентой
+изменений (services.version_service), а статическая выгрузка OSM обошла бы версии данных.
+
+Сборка хранилища (из каталога backend):
+    python -m services.columnar_store \\
+        --population "../data to load/bishkek_filtered.geojson" \\
+        --output data/store
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import h3
+import numpy as np
+
+STORE_FORMAT_VERSION = 1
+
+# Каталог хранилища по умолчанию
+STORE_PATH = os.getenv(
+    "COLUMNAR_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "store"),
+)
+
+POPULATION_COLUMNS = ("h3", "lat", "lon", "population")
+
+
+class ColumnarStore:
+    """
+    Хранилище только для чтения; массивы отображаются в память при первом обращении
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._manifest: Optional[Dict] = None
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, "manifest.json"))
+
+    @property
+    def manifest(self) -> Dict:
+        if self._manifest is None:
+            with open(os.path.join(self.path, "manifest.json"), "r", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+            if self._manifest.get("format_version") != STORE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported columnar store version in {self.path}")
+        return self._manifest
+
+    def _column(self, table: str, column: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, table, f"{column}.npy"), mmap_mode="r")
+
+    def read_population(self) -> Dict[str, np.ndarray]:
+        """
+        Колонки слоя населения (h3 - uint64-индексы H3)
+        """
+        return {column: self._column("population", column) for column in POPULATION_COLUMNS}
+
+
+def _write_table(path: str, table: str, columns: Dict[str, np.ndarray]) -> None:
+    os.makedirs(os.path.join(path, table), exist_ok=True)
+    for column, values in columns.items():
+        np.save(os.path.join(path, table, f"{column}.npy"), np.ascontiguousarray(values))
+
+
+def build_store(output: str, population_path: str) -> Dict:
+    """
+    Собирает хранилище во временном каталоге и атомарно подменяет им output
+
+    :return: Манифест собранного хранилища
+    """
+    from services.population_service import read_population_geojson
+
+    layer = read_population_geojson(population_path)
+    population = {
+        "h3": np.array([h3.str_to_int(cell) for cell in layer.h3_ids], dtype=np.uint64),
+        "lat": layer.lat,
+        "lon": layer.lon,
+        "population": layer.population,
+    }
+
+    manifest = {
+        "format_version": STORE_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sources": {"population": population_path},
+        "population_count": int(len(layer)),
+    }
+
+    parent = os.path.dirname(os.path.abspath(output))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".store-", dir=parent)
+    try:
+        _write_table(tmp, "population", population)
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        if os.path.exists(output):
+            shutil.rmtree(output)
+        os.replace(tmp, output)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Сборка колоночного хранилища населения")
+    parser.add_argument("--population", required=True, help="GeoJSON с H3-гексагонами (h3, population)")
+    parser.add_argument("--output", default=STORE_PATH, help="Каталог хранилища")
+    args = parser.parse_args(argv)
+
+    manifest = build_store(args.output, args.population)
+    print(f"Хранилище собрано в {args.output}: {manifest['population_count']} гексагонов")
+
+
+if __name__ == "__main__":
+    main()
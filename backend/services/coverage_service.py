@@ -0,0 +1,267 @@
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import h3
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from constants.facilities import COVERAGE_RADIUS, DEFAULT_REGION
+from models.database import CoverageSummaryModel, FacilityChangeModel
+from services.population_service import PopulationLayer, load_population_layer
+from services.region_service import get_region_data
+from services.version_service import changes_between, last_change_version, resolve_version, snapshot_coordinates
+from utils.metrics import timed
+
+
+# Сколько последних версий сводок хранить по каждому региону и типу объекта
+COVERAGE_SUMMARY_RETENTION = int(os.getenv("COVERAGE_SUMMARY_RETENTION", "20"))
+
+
+class CoverageIndex:
+    """
+    Счетчик покрытия по гексагонам для одного типа объектов.
+    counts[i] - сколько объектов покрывают гексагон i, поэтому добавление
+    и удаление объекта обновляют только гексагоны в его радиусе.
+    """
+
+    def __init__(self, layer: PopulationLayer, radius_km: float):
+        self.layer = layer
+        self.radius_km = radius_km
+        self.counts = np.zeros(len(layer), dtype=np.int32)
+        # Версия данных, до которой учтены изменения (-1 - индекс еще не загружен)
+        self.version = -1
+
+    def add(self, lat: np.ndarray, lon: np.ndarray) -> None:
+        for idx in self.layer.cells_within(lat, lon, self.radius_km):
+            self.counts[idx] += 1
+
+    def remove(self, lat: np.ndarray, lon: np.ndarray) -> None:
+        for idx in self.layer.cells_within(lat, lon, self.radius_km):
+            self.counts[idx] -= 1
+
+    def apply_changes(self, changes: List[FacilityChangeModel], facility_type: str, reverse: bool = False) -> None:
+        """
+        Учитывает изменения из ленты (или откатывает их при reverse=True)
+        """
+        added, removed = [], []
+        for change in changes:
+            if change.operation != "insert" and change.old_facility_type == facility_type:
+                removed.append((change.old_latitude, change.old_longitude))
+            if change.operation != "delete" and change.facility_type == facility_type:
+                added.append((change.latitude, change.longitude))
+        if reverse:
+            added, removed = removed, added
+        for points, apply in ((added, self.add), (removed, self.remove)):
+            if points:
+                lat, lon = np.array(points, dtype=np.float64).T
+                apply(lat, lon)
+
+    def copy(self) -> "CoverageIndex":
+        index = CoverageIndex.__new__(CoverageIndex)
+        index.layer, index.radius_km, index.version = self.layer, self.radius_km, self.version
+        index.counts = self.counts.copy()
+        return index
+
+    @property
+    def covered(self) -> np.ndarray:
+        return self.counts > 0
+
+
+class CoverageService:
+    """
+    Сводки покрытия (охваченное население, доля, количество зон без покрытия),
+    материализованные в таблице coverage_summaries по ключу (регион, тип, версия данных)
+    """
+
+    def __init__(self, layer: Optional[PopulationLayer] = None, region: str = DEFAULT_REGION):
+        self.layer = layer or load_population_layer()
+        self.region = region
+        self._indexes: Dict[str, CoverageIndex] = {}
+        self._adjacency: Optional[csr_matrix] = None
+        self._lock = threading.Lock()
+
+    @property
+    def adjacency(self) -> csr_matrix:
+        """
+        Граф соседства гексагонов слоя (строится один раз)
+        """
+        if self._adjacency is None:
+            position = self.layer.positions
+            rows, cols = [], []
+            for cell, i in position.items():
+                for neighbour in h3.grid_ring(cell, 1):
+                    j = position.get(neighbour)
+                    if j is not None:
+                        rows.append(i)
+                        cols.append(j)
+            n = len(self.layer)
+            self._adjacency = csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+        return self._adjacency
+
+    def _sync_index(self, db: Session, facility_type: str, version: int) -> CoverageIndex:
+        """
+        Продвигает индекс вперед до версии version: первый раз загружает снимок,
+        затем применяет только изменения из ленты
+        """
+        index = self._indexes.get(facility_type)
+        if index is None:
+            index = CoverageIndex(self.layer, COVERAGE_RADIUS[facility_type])
+            self._indexes[facility_type] = index
+
+        if index.version < 0:
+            coords = snapshot_coordinates(db, version, [facility_type])[facility_type]
+            index.add(coords[:, 0], coords[:, 1])
+            index.version = version
+        elif index.version < version:
+            with timed("db.coverage.changes"):
+                changes = changes_between(db, index.version, version, [facility_type])
+            index.apply_changes(changes, facility_type)
+            index.version = version
+        return index
+
+    def _index_at(self, db: Session, facility_type: str, version: int) -> CoverageIndex:
+        """
+        Индекс на версию version. Если общий индекс уже ушел вперед,
+        возвращается его копия с откатом более поздних изменений.
+        """
+        index = self._sync_index(db, facility_type, version)
+        if index.version == version:
+            return index
+        snapshot = index.copy()
+        snapshot.apply_changes(changes_between(db, version, index.version, [facility_type]), facility_type, reverse=True)
+        snapshot.version = version
+        return snapshot
+
+    def covered_mask(self, db: Session, facility_type: str, version: Optional[int] = None) -> np.ndarray:
+        """
+        Маска покрытых гексагонов на версию данных (по умолчанию текущую), без пересчета с нуля
+        """
+        if facility_type not in COVERAGE_RADIUS:
+            raise ValueError(f"Unsupported facility type: {facility_type}")
+        version = last_change_version(db, resolve_version(db, version), facility_type)
+        with self._lock:
+            return self._index_at(db, facility_type, version).covered.copy()
+
+    def summarize(self, index: CoverageIndex) -> Dict:
+        """
+        Считает сводку по текущему состоянию индекса
+        """
+        population = self.layer.population
+        total = float(population.sum())
+        covered_population = float(population[index.covered].sum())
+
+        # Зоны без покрытия - связные группы населенных непокрытых гексагонов
+        gap_mask = ~index.covered & (population > 0)
+        gaps, largest_gap = 0, 0.0
+        if gap_mask.any():
+            cells = np.flatnonzero(gap_mask)
+            gaps, labels = connected_components(self.adjacency[cells][:, cells], directed=False)
+            largest_gap = float(np.bincount(labels, weights=population[cells]).max())
+
+        return {
+            "total_population": total,
+            "covered_population": covered_population,
+            "coverage_share": covered_population / total if total else 0.0,
+            "gaps": int(gaps),
+            "largest_gap_population": largest_gap,
+        }
+
+    def get_summary(self, db: Session, facility_type: str, version: Optional[int] = None) -> Dict:
+        """
+        Возвращает сводку на версию данных (по умолчанию текущую); пересчитывает только если ее еще нет.
+        Сводка привязана к последнему изменению объектов этого типа, поэтому
+        изменения других типов ее не сбрасывают.
+        """
+        if facility_type not in COVERAGE_RADIUS:
+            raise ValueError(f"Unsupported facility type: {facility_type}")
+
+        version = last_change_version(db, resolve_version(db, version), facility_type)
+        row = db.query(CoverageSummaryModel).filter(
+            CoverageSummaryModel.region == self.region,
+            CoverageSummaryModel.facility_type == facility_type,
+            CoverageSummaryModel.data_version == version
+        ).first() # type: ignore
+        if row is not None:
+            return self._row_to_dict(row)
+
+        with self._lock:
+            index = self._index_at(db, facility_type, version)
+            with timed("coverage.summarize"):
+                summary = self.summarize(index)
+        return self._materialize(db, facility_type, version, summary)
+
+    def refresh(self, db: Session, facility_types: Optional[List[str]] = None, version: Optional[int] = None) -> List[Dict]:
+        """
+        Инкрементально обновляет сводки после изменения объектов
+        """
+        return [self.get_summary(db, t, version) for t in (facility_types or list(COVERAGE_RADIUS))]
+
+    def _materialize(self, db: Session, facility_type: str, version: int, summary: Dict) -> Dict:
+        row = CoverageSummaryModel(
+            region=self.region,
+            facility_type=facility_type,
+            data_version=version,
+            updated_at=datetime.utcnow(),
+            **summary
+        )
+        db.add(row)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Ту же сводку уже записал параллельный запрос или другой воркер
+            db.rollback()
+        else:
+            self._prune(db, facility_type)
+        return {
+            "region": self.region,
+            "facility_type": facility_type,
+            "data_version": version,
+            **summary
+        }
+
+    def _prune(self, db: Session, facility_type: str) -> None:
+        """
+        Удаляет сводки старше COVERAGE_SUMMARY_RETENTION последних версий данных
+        (при необходимости они будут пересчитаны по запросу)
+        """
+        summaries = db.query(CoverageSummaryModel).filter(
+            CoverageSummaryModel.region == self.region,
+            CoverageSummaryModel.facility_type == facility_type
+        )
+        # Самая старая из сохраняемых версий; версии по региону и типу уникальны
+        oldest_kept = summaries.with_entities(CoverageSummaryModel.data_version).order_by(
+            CoverageSummaryModel.data_version.desc()
+        ).offset(COVERAGE_SUMMARY_RETENTION - 1).limit(1).scalar() # type: ignore
+        if oldest_kept is None:
+            return
+        summaries.filter(
+            CoverageSummaryModel.data_version < oldest_kept
+        ).delete(synchronize_session=False) # type: ignore
+        db.commit()
+
+    @staticmethod
+    def _row_to_dict(row: CoverageSummaryModel) -> Dict:
+        return {
+            "region": row.region,
+            "facility_type": row.facility_type,
+            "data_version": row.data_version,
+            "total_population": row.total_population,
+            "covered_population": row.covered_population,
+            "coverage_share": row.coverage_share,
+            "gaps": row.gaps,
+            "largest_gap_population": row.largest_gap_population,
+        }
+
+
+def get_coverage_service(region: str = DEFAULT_REGION) -> CoverageService:
+    """
+    Сервис сводок региона: индексы покрытия живут между запросами, пока регион загружен
+
+    :raises KeyError: Регион не зарегистрирован
+    """
+    return get_region_data(region).coverage
@@ -0,0 +1,283 @@
+"""
+Настраиваемая целевая функция размещения с учетом справедливости доступа.
+
+Матрица "кандидат - гексагон" с расстояниями строится один раз на тип объекта.
+Веса гексагонов (приоритетные зоны, демография) - массивы, выровненные по индексу
+слоя населения, поэтому их изменение требует только пересчета оценок.
+"""
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import MultiPoint
+from sklearn.neighbors import BallTree
+
+from constants.facilities import DISTANCE_DECAY_TYPES, OBJECTIVE_REACH_FACTOR, PLACEMENT_OBJECTIVES
+from services.population_service import EARTH_RADIUS_KM, PopulationLayer
+
+
+def distance_decay(distance_km: np.ndarray, radius_km: float, decay: str = "step") -> np.ndarray:
+    """
+    Уровень доступности (0..1) в зависимости от расстояния; за пределами радиуса - 0
+
+    :param distance_km: Расстояния в км (inf - объекта нет)
+    :param radius_km: Радиус охвата в км
+    :param decay: step, linear, exponential или gaussian
+    """
+    within = distance_km <= radius_km
+    if decay == "step":
+        return within.astype(np.float64)
+    ratio = np.where(within, distance_km / radius_km, 1.0)
+    if decay == "linear":
+        return np.where(within, 1.0 - ratio, 0.0)
+    if decay == "exponential":
+        return np.where(within, np.exp(-3.0 * ratio), 0.0)
+    if decay == "gaussian":
+        return np.where(within, np.exp(-2.0 * ratio ** 2), 0.0)
+    raise ValueError(f"Unsupported distance decay: {decay}")
+
+
+def nearest_distance(layer: PopulationLayer, existing: np.ndarray) -> np.ndarray:
+    """
+    Расстояние (км) от каждого гексагона до ближайшего существующего объекта
+
+    :param existing: Массив (N, 2) координат объектов (lat, lon)
+    """
+    if not len(existing):
+        return np.full(len(layer), np.inf)
+    tree = BallTree(np.radians(existing), metric="haversine")
+    distance, _ = tree.query(layer.coords_rad, k=1)
+    return distance[:, 0] * EARTH_RADIUS_KM
+
+
+class CellWeights:
+    """
+    Построение весов гексагонов. Маски приоритетных зон считаются один раз на слой.
+    """
+
+    def __init__(self, layer: PopulationLayer):
+        self.layer = layer
+        self._zone_masks: Dict[str, np.ndarray] = {}
+
+    def zone_mask(self, zone: Dict) -> np.ndarray:
+        """
+        Маска гексагонов внутри зоны (выпуклая оболочка ее вершин)
+        """
+        mask = self._zone_masks.get(zone["name"])
+        if mask is None:
+            polygon = MultiPoint(zone["coordinates"]).convex_hull
+            mask = shapely.contains_xy(polygon, self.layer.lon, self.layer.lat)
+            self._zone_masks[zone["name"]] = mask
+        return mask
+
+    def build(self,
+              priority_zones: Iterable[Dict] = (),
+              priority_weight: Optional[float] = None,
+              cell_weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Собирает массив весов, выровненный по гексагонам слоя
+
+        :param priority_zones: Зоны из PRIORITY_ZONES
+        :param priority_weight: Множитель для всех зон вместо заданного в самой зоне
+        :param cell_weights: Индекс H3 -> множитель (демографические веса, например доля детей)
+        :return: Массив весов (1.0 - обычный житель)
+        """
+        weights = np.ones(len(self.layer))
+        for zone in priority_zones:
+            weight = zone["weight"] if priority_weight is None else priority_weight
+            weights[self.zone_mask(zone)] *= weight
+        if cell_weights:
+            positions = self.layer.positions
+            for cell, weight in cell_weights.items():
+                i = positions.get(cell)
+                if i is not None:
+                    weights[i] *= weight
+        return weights
+
+
+def objective_reach(radius_km: float, objective: str) -> float:
+    """
+    Радиус поиска гексагонов вокруг кандидата: покрытию достаточно радиуса охвата,
+    p_median и min_max учитывают и более далеких жителей
+    """
+    return radius_km if objective == "coverage" else radius_km * OBJECTIVE_REACH_FACTOR
+
+
+class PlacementObjective:
+    """
+    Жадное размещение для одной из целевых функций:
+    - coverage: максимум взвешенного населения с доступом (с учетом затухания с расстоянием);
+    - p_median: минимум среднего взвешенного расстояния до ближайшего объекта;
+    - min_max: минимум наибольшего взвешенного расстояния (сначала обслуживаются самые ущемленные гексагоны).
+    """
+
+    def __init__(self,
+                 layer: PopulationLayer,
+                 radius_km: float,
+                 candidates: Optional[np.ndarray] = None,
+                 objective: str = "coverage"):
+        """
+        :param layer: Слой населения
+        :param radius_km: Радиус охвата в км
+        :param candidates: Массив (M, 2) координат кандидатов (lat, lon); по умолчанию центроиды гексагонов
+        :param objective: Целевая функция, для которой строится матрица (определяет радиус поиска)
+        """
+        self.layer = layer
+        self.radius_km = radius_km
+        self.reach_km = objective_reach(radius_km, objective)
+        self.from_cells = candidates is None
+        if candidates is None:
+            self.cand_lat, self.cand_lon = layer.lat, layer.lon
+        else:
+            self.cand_lat, self.cand_lon = candidates[:, 0], candidates[:, 1]
+
+        # Разреженная матрица в плоском виде: строки - кандидаты, столбцы - гексагоны, значения - км
+        indices, distances = layer.cells_within_distance(self.cand_lat, self.cand_lon, self.reach_km)
+        lengths = np.fromiter((len(i) for i in indices), dtype=np.int64, count=len(indices))
+        self.rows = np.repeat(np.arange(len(lengths)), lengths)
+        self.cells = np.concatenate(indices).astype(np.int64) if len(indices) else np.empty(0, dtype=np.int64)
+        self.distance = np.concatenate(distances) if len(distances) else np.empty(0)
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)])
+        self.reachable = np.zeros(len(layer), dtype=bool)
+        self.reachable[self.cells] = True
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _gains(self, objective: str, decay: str, demand: np.ndarray, nearest: np.ndarray) -> np.ndarray:
+        current = nearest[self.cells]
+        if objective == "coverage":
+            improvement = (distance_decay(self.distance, self.radius_km, decay)
+                           - distance_decay(current, self.radius_km, decay))
+        else:
+            improvement = np.minimum(current, self.reach_km) - self.distance
+        values = demand[self.cells] * np.clip(improvement, 0.0, None)
+        return np.bincount(self.rows, weights=values, minlength=len(self))
+
+    def evaluate(self,
+                 objective: str,
+                 decay: str,
+                 weights: np.ndarray,
+                 nearest: np.ndarray,
+                 population: Optional[np.ndarray] = None) -> float:
+        """
+        Значение целевой функции при заданных расстояниях до ближайших объектов
+
+        :param population: Население, которое нужно обслужить (по умолчанию - все население слоя)
+        """
+        population = self.layer.population if population is None else population
+        demand = population * weights
+        total = float(demand.sum())
+        if objective == "coverage":
+            return float((demand * distance_decay(nearest, self.radius_km, decay)).sum()) / total if total else 0.0
+        capped = np.minimum(nearest, self.reach_km)
+        if objective == "p_median":
+            return float((demand * capped).sum()) / total if total else 0.0
+        populated = population > 0
+        return float((weights * capped)[populated].max()) if populated.any() else 0.0
+
+    def solve(self,
+              existing: np.ndarray,
+              count: int,
+              objective: str = "coverage",
+              decay: str = "step",
+              weights: Optional[np.ndarray] = None,
+              unserved: Optional[np.ndarray] = None) -> Dict:
+        """
+        Подбирает места для count новых объектов
+
+        :param existing: Массив (N, 2) координат существующих объектов (lat, lon)
+        :param count: Количество новых объектов
+        :param objective: coverage, p_median или min_max
+        :param decay: Функция затухания доступности (для coverage)
+        :param weights: Веса гексагонов из CellWeights.build (по умолчанию все 1.0)
+        :param unserved: Жители по гексагонам, которым не хватило мест в существующих объектах
+                         (см. assign_demand). Оптимизируется доступ только для них, а существующие
+                         объекты для них недоступны, так как заполнены
+        :return: Словарь в формате greedy_max_coverage и значения целевой функции до/после
+        """
+        if objective not in PLACEMENT_OBJECTIVES:
+            raise ValueError(f"Unsupported placement objective: {objective}")
+        if decay not in DISTANCE_DECAY_TYPES:
+            raise ValueError(f"Unsupported distance decay: {decay}")
+        if objective_reach(self.radius_km, objective) > self.reach_km:
+            raise ValueError(f"Matrix built for reach {self.reach_km} km cannot solve {objective}")
+
+        total = float(self.layer.population.sum())
+        weights = np.ones(len(self.layer)) if weights is None else weights
+        if unserved is None:
+            population = self.layer.population
+            nearest = nearest_distance(self.layer, existing)
+            covered_before = float(population[nearest <= self.radius_km].sum())
+        else:
+            population = unserved.astype(np.float64)
+            nearest = np.full(len(self.layer), np.inf)
+            covered_before = total - float(population.sum())
+        demand = population * weights
+        objective_before = self.evaluate(objective, decay, weights, nearest, population)
+
+        selected: List[Dict] = []
+        for _ in range(min(count, len(self))):
+            gains = self._gains(objective, decay, demand, nearest)
+            if objective == "min_max":
+                # Выбираем только среди кандидатов, которые дотягиваются до самого ущемленного гексагона
+                burden = np.where(self.reachable & (population > 0), weights * np.minimum(nearest, self.reach_km), 0.0)
+                worst = int(np.argmax(burden))
+                if burden[worst] <= 0:
+                    break
+                serving = np.zeros(len(self), dtype=bool)
+                serving[self.rows[self.cells == worst]] = True
+                gains = np.where(serving, gains, -np.inf)
+            best = int(np.argmax(gains))
+            if gains[best] <= 0:
+                break
+
+            segment = slice(self.offsets[best], self.offsets[best + 1])
+            cells, distance = self.cells[segment], self.distance[segment]
+            newly_covered = (distance <= self.radius_km) & (nearest[cells] > self.radius_km)
+            nearest[cells] = np.minimum(nearest[cells], distance)
+            selected.append({
+                "index": best,
+                "h3": self.layer.cell_id(best) if self.from_cells else None,
+                "latitude": float(self.cand_lat[best]),
+                "longitude": float(self.cand_lon[best]),
+                "covered_population": float(population[cells[newly_covered]].sum()),
+                "gain": float(gains[best]),
+            })
+
+        objective_after = self.evaluate(objective, decay, weights, nearest, population)
+        covered_after = float(population[nearest <= self.radius_km].sum())
+        if unserved is not None:
+            # Жители в пределах вместимости существующих объектов уже обслужены
+            covered_after += covered_before
+        if objective == "coverage":
+            unserved = 1.0 - objective_before
+            improvement = (objective_after - objective_before) / unserved * 100 if unserved > 0 else 0.0
+        else:
+            improvement = (objective_before - objective_after) / objective_before * 100 if objective_before > 0 else 0.0
+
+        return {
+            "locations": selected,
+            "total_population": total,
+            "covered_before": covered_before,
+            "covered_after": covered_after,
+            "objective": objective,
+            "objective_before": objective_before,
+            "objective_after": objective_after,
+            "improvement_score": improvement,
+        }
+
+
+_objectives: "weakref.WeakKeyDictionary[PopulationLayer, Dict[Tuple[float, float], PlacementObjective]]" = weakref.WeakKeyDictionary()
+
+
+def get_objective(layer: PopulationLayer, radius_km: float, objective: str = "coverage") -> PlacementObjective:
+    """
+    Матрица по центроидам гексагонов строится один раз на слой, радиус и радиус поиска
+    """
+    reach_km = objective_reach(radius_km, objective)
+    by_radius = _objectives.setdefault(layer, {})
+    if (radius_km, reach_km) not in by_radius:
+        by_radius[(radius_km, reach_km)] = PlacementObjective(layer, radius_km, objective=objective)
+    return by_radius[(radius_km, reach_km)]
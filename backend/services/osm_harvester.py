@@ -0,0 +1,424 @@
+"""
+Асинхронная выгрузка объектов инфраструктуры из OpenStreetMap (Overpass API) по всей стране.
+
+Граница разбивается на тайлы; тайлы, по которым Overpass возвращает слишком много объектов
+или ошибку таймаута, делятся на 4 части. Запросы идут параллельно с ограничением числа
+одновременных запросов и частоты, прогресс сохраняется в файл, чтобы обход можно было продолжить.
+
+Запуск (из каталога backend):
+    python -m services.osm_harvester --boundary "../data to load/kyrgyzstan.geojson" \\
+        --checkpoint data/harvest_checkpoint.json --concurrency 8 --rate 2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import aiohttp
+from shapely.geometry import box, shape
+from shapely.ops import unary_union
+from sqlalchemy.orm import Session
+
+from constants.facilities import OSM_AMENITY_TYPES
+from models.database import FacilityModel, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+OVERPASS_URL = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+
+# Тайл = (south, west, north, east)
+Tile = Tuple[float, float, float, float]
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов (token bucket)
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TileTooLarge(Exception):
+    """Overpass не справился с тайлом - его нужно разбить"""
+
+
+def tile_key(tile: Tile) -> str:
+    return ",".join(f"{v:.6f}" for v in tile)
+
+
+def split_tile(tile: Tile) -> List[Tile]:
+    south, west, north, east = tile
+    mid_lat, mid_lon = (south + north) / 2, (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lon),
+        (south, mid_lon, mid_lat, east),
+        (mid_lat, west, north, mid_lon),
+        (mid_lat, mid_lon, north, east),
+    ]
+
+
+def load_boundary(path: str):
+    """
+    Граница обхода из GeoJSON. Если файл описывает сами объекты, а не границу (например,
+    kyrgyzstan.geojson: 1057 точек и 333 полигона-контура зданий), объединение не будет
+    полигоном, и используется выпуклая оболочка всех объектов.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    features = data.get("features", [data] if data.get("type") == "Feature" else [])
+    geometry = unary_union([shape(f["geometry"]) for f in features if f.get("geometry")])
+    if geometry.geom_type not in ("Polygon", "MultiPolygon"):
+        geometry = geometry.convex_hull
+    return geometry
+
+
+def initial_tiles(boundary, size: float) -> List[Tile]:
+    """
+    Сетка тайлов размером size градусов, пересекающих границу
+    """
+    minx, miny, maxx, maxy = boundary.bounds
+    tiles = []
+    lat = miny
+    while lat < maxy:
+        lon = minx
+        while lon < maxx:
+            tile = (lat, lon, min(lat + size, maxy), min(lon + size, maxx))
+            if boundary.intersects(box(tile[1], tile[0], tile[3], tile[2])):
+                tiles.append(tile)
+            lon += size
+        lat += size
+    return tiles
+
+
+def build_query(tile: Tile, amenities: Iterable[str], timeout: int) -> str:
+    bbox = "{:.6f},{:.6f},{:.6f},{:.6f}".format(*tile)
+    pattern = "|".join(sorted(amenities))
+    return (
+        f"[out:json][timeout:{timeout}];"
+        f'nwr["amenity"~"^({pattern})$"]({bbox});'
+        "out center tags;"
+    )
+
+
+def parse_elements(elements: List[Dict]) -> List[Dict]:
+    """
+    Преобразует элементы Overpass в записи объектов (у way/relation берется центр)
+    """
+    facilities = []
+    for element in elements:
+        tags = element.get("tags") or {}
+        facility_type = OSM_AMENITY_TYPES.get(tags.get("amenity"))
+        if facility_type is None:
+            continue
+        center = element.get("center") or element
+        if "lat" not in center or "lon" not in center:
+            continue
+        street = " ".join(filter(None, [tags.get("addr:street"), tags.get("addr:housenumber")]))
+        facilities.append({
+            "osm_key": f"{element.get('type', 'node')}/{element.get('id')}",
+            "name": (tags.get("name") or tags.get("name:ru") or f"{facility_type}_{element.get('id')}")[:255],
+            "address": street[:255],
+            "latitude": float(center["lat"]),
+            "longitude": float(center["lon"]),
+            "facility_type": facility_type,
+            "city": (tags.get("addr:city") or "")[:100],
+            "country": "Кыргызстан",
+        })
+    return facilities
+
+
+class Checkpoint:
+    """
+    Прогресс обхода: обработанные тайлы, очередь, уже сохраненные OSM-объекты
+    и тайлы минимального размера, которые Overpass так и не смог обработать
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: Set[str] = set()
+        self.pending: List[Tile] = []
+        self.seen: Set[str] = set()
+        self.failed: Set[str] = set()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.pending = [tuple(t) for t in data.get("pending", [])]
+            self.seen = set(data.get("seen", []))
+            self.failed = set(data.get("failed", []))
+
+    def save(self, pending: Iterable[Tile]) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "done": sorted(self.done),
+                "pending": [list(t) for t in pending],
+                "seen": sorted(self.seen),
+                "failed": sorted(self.failed),
+            }, f)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        """
+        Обход завершен - следующий запуск начнется заново (полное обновление)
+        """
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def save_facilities(facilities: List[Dict]) -> int:
+    """
+    Записывает объекты в таблицу facilities с обновлением по OSM id: перемещенный или
+    перетегированный в OSM объект обновляет свою запись, а не добавляется повторно.
+    Записи без OSM id (загруженные раньше) сопоставляются по типу и координатам
+    (с точностью ~10 см) и получают OSM id.
+
+    :return: Количество добавленных и измененных записей
+    """
+    if not facilities:
+        return 0
+    db: Session = SessionLocal()
+    try:
+        by_osm_id = {f["osm_key"]: f for f in facilities}
+        existing = {
+            row.osm_id: row
+            for row in db.query(FacilityModel).filter(FacilityModel.osm_id.in_(list(by_osm_id))).all() # type: ignore
+        }
+        legacy = {}
+        new = [f for key, f in by_osm_id.items() if key not in existing]
+        if new:
+            lats = [f["latitude"] for f in new]
+            lons = [f["longitude"] for f in new]
+            legacy = {
+                (row.facility_type, round(row.latitude, 6), round(row.longitude, 6)): row
+                for row in db.query(FacilityModel).filter(
+                    FacilityModel.osm_id.is_(None),
+                    FacilityModel.latitude >= min(lats), FacilityModel.latitude <= max(lats),
+                    FacilityModel.longitude >= min(lons), FacilityModel.longitude <= max(lons)
+                ).all() # type: ignore
+            }
+
+        written = 0
+        for osm_id, f in by_osm_id.items():
+            values = {k: v for k, v in f.items() if k != "osm_key"}
+            row = existing.get(osm_id) or legacy.pop(
+                (f["facility_type"], round(f["latitude"], 6), round(f["longitude"], 6)), None
+            )
+            if row is None:
+                # Через ORM, а не bulk_insert_mappings, чтобы вставки попали в ленту изменений
+                db.add(FacilityModel(osm_id=osm_id, **values))
+                written += 1
+                continue
+            row.osm_id = osm_id
+            for key, value in values.items():
+                # Пустые теги OSM не затирают заполненные вручную поля (город, адрес)
+                if value or key in ("latitude", "longitude"):
+                    setattr(row, key, value)
+            if db.is_modified(row):
+                written += 1
+        db.commit()
+        return written
+    finally:
+        db.close()
+
+
+class OSMHarvester:
+    def __init__(self,
+                 overpass_url: str = OVERPASS_URL,
+                 concurrency: int = 4,
+                 rate: float = 1.0,
+                 max_elements: int = 5000,
+                 min_tile_size: float = 0.05,
+                 query_timeout: int = 60,
+                 max_retries: int = 5,
+                 checkpoint_path: Optional[str] = None):
+        """
+        :param overpass_url: Адрес Overpass API (можно указать локальный экземпляр)
+        :param concurrency: Максимум одновременных запросов
+        :param rate: Максимум запросов в секунду
+        :param max_elements: Если в тайле больше объектов, он делится на части
+        :param min_tile_size: Минимальный размер тайла в градусах
+        :param query_timeout: Таймаут запроса Overpass в секундах
+        :param max_retries: Повторы при 429/5xx и сетевых ошибках
+        :param checkpoint_path: Файл прогресса для продолжения обхода
+        """
+        self.overpass_url = overpass_url
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst=concurrency)
+        self.max_elements = max_elements
+        self.min_tile_size = min_tile_size
+        self.query_timeout = query_timeout
+        self.max_retries = max_retries
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.amenities = sorted(OSM_AMENITY_TYPES)
+        self.stats = {"tiles": 0, "splits": 0, "failed": 0, "elements": 0, "saved": 0}
+        # Запись в БД последовательная: один объект может прийти из соседних тайлов одновременно
+        self._write_lock = asyncio.Lock()
+        self._checkpoint_interval = 5.0
+
+    async def fetch_tile(self, session: aiohttp.ClientSession, tile: Tile) -> List[Dict]:
+        query = build_query(tile, self.amenities, self.query_timeout)
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                async with session.post(self.overpass_url, data={"data": query}) as response:
+                    if response.status == 200:
+                        data = await response.json(content_type=None)
+                        remark = data.get("remark") or ""
+                        if "runtime error" in remark and "timed out" in remark:
+                            raise TileTooLarge(remark)
+                        return data.get("elements", [])
+                    if response.status == 413 or (response.status == 504 and attempt > 0):
+                        # Слишком тяжелый запрос - дробим тайл, а не повторяем.
+                        # 400 - ошибка в самом запросе: дробление лишь размножило бы ее на подтайлы
+                        raise TileTooLarge(f"HTTP {response.status}")
+                    if response.status not in (429, 502, 503, 504):
+                        response.raise_for_status()
+                    retry_after = response.headers.get("Retry-After")
+                    if retry_after and retry_after.isdigit():
+                        delay = max(delay, float(retry_after))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                logger.warning("Overpass request failed for %s: %s", tile_key(tile), e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+        raise RuntimeError(f"Overpass request failed after {self.max_retries} retries: {tile_key(tile)}")
+
+    async def process_tile(self, session: aiohttp.ClientSession, tile: Tile) -> List[Tile]:
+        """
+        Обрабатывает тайл и возвращает тайлы, которые нужно обработать вместо него
+        """
+        size = min(tile[2] - tile[0], tile[3] - tile[1])
+        can_split = size / 2 >= self.min_tile_size
+        try:
+            elements = await self.fetch_tile(session, tile)
+        except TileTooLarge as e:
+            if not can_split:
+                # Тайл уже минимального размера - запоминаем его и продолжаем обход
+                logger.warning("Tile %s is too large for Overpass and cannot be split: %s", tile_key(tile), e)
+                self.checkpoint.failed.add(tile_key(tile))
+                self.stats["failed"] += 1
+                return []
+            self.stats["splits"] += 1
+            return split_tile(tile)
+
+        if len(elements) >= self.max_elements and can_split:
+            self.stats["splits"] += 1
+            return split_tile(tile)
+
+        async with self._write_lock:
+            facilities = [
+                f for f in parse_elements(elements) if f["osm_key"] not in self.checkpoint.seen
+            ]
+            saved = await asyncio.to_thread(save_facilities, facilities)
+            self.checkpoint.seen.update(f["osm_key"] for f in facilities)
+            self.checkpoint.done.add(tile_key(tile))
+        self.stats["tiles"] += 1
+        self.stats["elements"] += len(elements)
+        self.stats["saved"] += saved
+        return []
+
+    async def run(self, tiles: List[Tile], boundary=None) -> Dict:
+        """
+        Обходит тайлы (или продолжает обход из checkpoint)
+
+        :param tiles: Начальные тайлы
+        :param boundary: Граница обхода - части разбитых тайлов вне ее пропускаются
+        """
+        queue: List[Tile] = self.checkpoint.pending or [
+            t for t in tiles if tile_key(t) not in self.checkpoint.done | self.checkpoint.failed
+        ]
+        in_flight: Set[asyncio.Task] = set()
+        task_tiles: Dict[asyncio.Task, Tile] = {}
+        timeout = aiohttp.ClientTimeout(total=self.query_timeout + 30)
+        last_saved = time.monotonic()
+
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            try:
+                while queue or in_flight:
+                    while queue and len(in_flight) < self.concurrency:
+                        tile = queue.pop()
+                        task = asyncio.create_task(self.process_tile(session, tile))
+                        in_flight.add(task)
+                        task_tiles[task] = tile
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        # Тайл снимается с учета только после успеха: упавший тайл
+                        # остается в task_tiles и попадает в checkpoint для повтора
+                        next_tiles = task.result()
+                        task_tiles.pop(task)
+                        queue.extend(
+                            t for t in next_tiles
+                            if boundary is None or boundary.intersects(box(t[1], t[0], t[3], t[2]))
+                        )
+                    if time.monotonic() - last_saved >= self._checkpoint_interval:
+                        self.checkpoint.save(queue + list(task_tiles.values()))
+                        last_saved = time.monotonic()
+                        logger.info(
+                            "Tiles done: %s, queued: %s, saved facilities: %s",
+                            self.stats["tiles"], len(queue) + len(in_flight), self.stats["saved"]
+                        )
+            except BaseException:
+                for task in in_flight:
+                    task.cancel()
+                self.checkpoint.save(queue + list(task_tiles.values()))
+                raise
+
+        if self.checkpoint.failed:
+            logger.warning(
+                "Tiles not harvested (too large for Overpass at the minimum tile size): %s",
+                ", ".join(sorted(self.checkpoint.failed))
+            )
+        # Следующий полный обход снова попробует и эти тайлы
+        self.checkpoint.clear()
+        return self.stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Выгрузка объектов инфраструктуры из OSM по всей стране")
+    parser.add_argument("--boundary", required=True, help="GeoJSON с границей обхода")
+    parser.add_argument("--overpass-url", default=OVERPASS_URL)
+    parser.add_argument("--tile-size", type=float, default=1.0, help="Начальный размер тайла в градусах")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0, help="Запросов в секунду")
+    parser.add_argument("--max-elements", type=int, default=5000)
+    parser.add_argument("--checkpoint", help="Файл прогресса для продолжения обхода")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    harvester = OSMHarvester(
+        overpass_url=args.overpass_url,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        max_elements=args.max_elements,
+        checkpoint_path=args.checkpoint,
+    )
+    boundary = load_boundary(args.boundary)
+    stats = asyncio.run(harvester.run(initial_tiles(boundary, args.tile_size), boundary))
+    print(f"Готово: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from constants.facilities import COVERAGE_RADIUS, DEFAULT_REGION, FACILITY_CAPACITY, FACILITY_NAMES
+from services.analysis_service import AnalysisService
+from services.capacity_service import assign_demand, overload_hotspots
+from services.objective_service import CellWeights, PlacementObjective, get_objective
+from services.population_service import PopulationLayer
+from services.region_service import RegionNotInherited, get_region_data, get_region_registry
+from services.scoring_service import flatten_neighbours, sum_by_candidate
+from utils.workers import map_in_pool, run_in_process
+
+
+def greedy_max_coverage(layer: PopulationLayer,
+                        existing: np.ndarray,
+                        radius_km: float,
+                        count: int,
+                        candidates: Optional[np.ndarray] = None,
+                        unserved: Optional[np.ndarray] = None) -> Dict:
+    """
+    Жадное решение задачи максимального покрытия населения.
+    По умолчанию кандидаты - центроиды H3-гексагонов слоя населения.
+
+    :param layer: Слой населения
+    :param existing: Массив (N, 2) координат существующих объектов (lat, lon)
+    :param radius_km: Радиус охвата в км
+    :param count: Количество новых объектов
+    :param candidates: Массив (M, 2) координат кандидатов (lat, lon), например центроиды горячих точек
+    :param unserved: Необслуженное население по гексагонам (по умолчанию - вне радиуса существующих объектов)
+    :return: Словарь с выбранными точками и показателями покрытия
+    """
+    total = float(layer.population.sum())
+    if unserved is None:
+        covered = layer.covered_mask(existing[:, 0], existing[:, 1], radius_km)
+        unserved = np.where(covered, 0.0, layer.population)
+    remaining = unserved.astype(np.float64)
+    covered_before = total - float(remaining.sum())
+
+    if candidates is None:
+        cand_lat, cand_lon = layer.lat, layer.lon
+    else:
+        cand_lat, cand_lon = candidates[:, 0], candidates[:, 1]
+
+    # Списки покрываемых гексагонов для каждого кандидата в плоском виде для reduceat
+    neighbours = layer.cells_within(cand_lat, cand_lon, radius_km)
+    flat, offsets, lengths = flatten_neighbours(neighbours)
+
+    selected = []
+    for _ in range(min(count, len(neighbours))):
+        gains = sum_by_candidate(remaining, flat, offsets, lengths)
+        best = int(np.argmax(gains))
+        if gains[best] <= 0:
+            break
+        remaining[neighbours[best]] = 0.0
+        selected.append({
+            "index": best,
+            "h3": layer.cell_id(best) if candidates is None else None,
+            "latitude": float(cand_lat[best]),
+            "longitude": float(cand_lon[best]),
+            "covered_population": float(gains[best]),
+        })
+
+    covered_after = total - float(remaining.sum())
+    uncovered_before = total - covered_before
+    return {
+        "locations": selected,
+        "total_population": total,
+        "covered_before": covered_before,
+        "covered_after": covered_after,
+        "improvement_score": (covered_after - covered_before) / uncovered_before * 100 if uncovered_before > 0 else 0.0,
+    }
+
+
+def hotspot_candidates(layer: PopulationLayer,
+                       existing: np.ndarray,
+                       radius_km: float,
+                       crs: Optional[str] = None) -> np.ndarray:
+    """
+    Центроиды кластеров непокрытого населения как компактный набор кандидатов
+
+    :param crs: Метрическая СК региона (Region.crs)
+    :return: Массив (M, 2) координат (lat, lon)
+    """
+    covered = layer.covered_mask(existing[:, 0], existing[:, 1], radius_km)
+    hotspots = AnalysisService().find_demand_hotspots(
+        layer, covered=covered, max_radius=radius_km * 1000, crs=crs
+    )
+    return np.array([[h["latitude"], h["longitude"]] for h in hotspots], dtype=np.float64).reshape(-1, 2)
+
+
+def solve_facility_type(layer: PopulationLayer,
+                        facility_type: str,
+                        existing: np.ndarray,
+                        count: int,
+                        use_hotspots: bool = False,
+                        objective: str = "coverage",
+                        decay: str = "step",
+                        weights: Optional[np.ndarray] = None,
+                        use_capacity: bool = False,
+                        crs: Optional[str] = None) -> Dict:
+    """
+    Подбирает места для одного типа объектов.
+    Без весов и затухания используется простое жадное покрытие, иначе - PlacementObjective.
+    С use_capacity кандидаты - центроиды зон, где жителям не хватило мест в существующих объектах,
+    а необслуженным считается население сверх вместимости.
+    crs - метрическая СК региона для кластеризации кандидатов.
+    """
+    radius_km = COVERAGE_RADIUS[facility_type]
+    unserved = None
+    overloaded = None
+    if use_capacity:
+        assignment = assign_demand(layer, existing, FACILITY_CAPACITY[facility_type], radius_km)
+        unserved = assignment["overflow"]
+        overloaded = int((assignment["demand_pressure"] > 1).sum())
+        hotspots = overload_hotspots(layer, assignment, radius_km, crs)
+        candidates = np.array(
+            [[h["latitude"], h["longitude"]] for h in hotspots], dtype=np.float64
+        ).reshape(-1, 2)
+    else:
+        candidates = hotspot_candidates(layer, existing, radius_km, crs) if use_hotspots else None
+
+    if objective == "coverage" and decay == "step" and weights is None:
+        result = greedy_max_coverage(layer, existing, radius_km, count, candidates=candidates, unserved=unserved)
+    else:
+        solver = (
+            get_objective(layer, radius_km, objective) if candidates is None
+            else PlacementObjective(layer, radius_km, candidates, objective=objective)
+        )
+        result = solver.solve(existing, count, objective=objective, decay=decay, weights=weights, unserved=unserved)
+    result["facility_type"] = facility_type
+    if overloaded is not None:
+        result["overloaded_facilities"] = overloaded
+    return result
+
+
+def _solve_facility_type(region: str,
+                         layer: Optional[PopulationLayer],
+                         facility_type: str,
+                         existing: np.ndarray,
+                         count: int,
+                         use_hotspots: bool,
+                         objective: str,
+                         decay: str,
+                         weights: Optional[np.ndarray],
+                         use_capacity: bool,
+                         crs: Optional[str]) -> Dict:
+    """
+    Точка входа для процесса пула. Слой региона (layer=None) берется из реестра регионов
+    процесса - после fork уже загруженный родителем; собственный слой сервиса передается целиком.
+    """
+    if layer is None:
+        layer = get_region_data(region).layer
+    return solve_facility_type(
+        layer, facility_type, existing, count, use_hotspots, objective, decay, weights, use_capacity, crs
+    )
+
+
+class PlacementService:
+    def __init__(self, layer: Optional[PopulationLayer] = None, region: str = DEFAULT_REGION):
+        # Без слоя берется слой региона: он загружен до запуска пула, и fork его унаследовал
+        self.layer = layer if layer is not None else get_region_data(region).layer
+        self.region = region
+        # Метрическая СК региона (для регионов вне реестра - локальная по охвату точек)
+        registry = get_region_registry()
+        self.crs = registry.get(region).crs if region in registry.regions else None
+        # Индекс тоже строим заранее, чтобы он был общим для всех типов и процессов
+        self.layer.tree
+        self.weights = CellWeights(self.layer)
+
+    def _pool_layer(self) -> Optional[PopulationLayer]:
+        """
+        Слой для процессов пула: None, если это слой региона из реестра (процессы пула
+        унаследовали его при fork), иначе собственный слой сервиса - он передается через pickle,
+        чтобы параллельный и последовательный расчеты шли по одному и тому же населению
+        """
+        for data in get_region_registry().loaded():
+            if data.region.key == self.region and data.layer is self.layer:
+                return None
+        return self.layer
+
+    def plan(self,
+             facilities_by_type: Dict[str, np.ndarray],
+             count: int = 5,
+             parallel: bool = True,
+             use_hotspots: bool = False,
+             objective: str = "coverage",
+             decay: str = "step",
+             weights: Optional[np.ndarray] = None,
+             use_capacity: bool = False) -> List[Dict]:
+        """
+        Подбирает места для нескольких типов объектов за один проход
+
+        :param facilities_by_type: Тип объекта -> массив (N, 2) координат существующих объектов (lat, lon)
+        :param count: Количество рекомендаций на каждый тип
+        :param parallel: Решать задачи по типам параллельно в пуле процессов
+        :param use_hotspots: Искать места только среди центроидов горячих точек спроса
+        :param objective: Целевая функция (coverage, p_median, min_max)
+        :param decay: Затухание доступности с расстоянием
+        :param weights: Веса гексагонов (см. CellWeights.build)
+        :param use_capacity: Размещать объекты в зонах, где существующим не хватает вместимости
+        :return: Список результатов по типам
+        """
+        for facility_type in facilities_by_type:
+            if facility_type not in COVERAGE_RADIUS:
+                raise ValueError(f"Unsupported facility type: {facility_type}")
+
+        types = list(facilities_by_type)
+        if parallel and len(types) > 1:
+            try:
+                layer = self._pool_layer()
+                return map_in_pool(_solve_facility_type, [
+                    (self.region, layer, t, facilities_by_type[t], count, use_hotspots, objective, decay, weights,
+                     use_capacity, self.crs)
+                    for t in types
+                ])
+            except RegionNotInherited:
+                # Регион загружен после запуска пула - решаем в текущем процессе
+                pass
+
+        return [
+            solve_facility_type(
+                self.layer, t, facilities_by_type[t], count, use_hotspots, objective, decay, weights, use_capacity,
+                self.crs
+            )
+            for t in types
+        ]
+
+    async def plan_async(self,
+                         facilities_by_type: Dict[str, np.ndarray],
+                         count: int = 5,
+                         use_hotspots: bool = False,
+                         objective: str = "coverage",
+                         decay: str = "step",
+                         weights: Optional[np.ndarray] = None,
+                         use_capacity: bool = False) -> List[Dict]:
+        """
+        То же, что plan, но каждый тип решается в пуле процессов, а цикл событий не блокируется.
+        Параллельные запросы (в том числе с одним типом) выполняются на разных ядрах.
+        """
+        for facility_type in facilities_by_type:
+            if facility_type not in COVERAGE_RADIUS:
+                raise ValueError(f"Unsupported facility type: {facility_type}")
+
+        layer = self._pool_layer()
+        try:
+            return list(await asyncio.gather(*[
+                run_in_process(
+                    _solve_facility_type,
+                    self.region, layer, t, facilities, count, use_hotspots, objective, decay, weights, use_capacity,
+                    self.crs
+                )
+                for t, facilities in facilities_by_type.items()
+            ]))
+        except RegionNotInherited:
+            # Регион загружен после запуска пула - решаем в потоке текущего процесса
+            return await asyncio.to_thread(
+                self.plan, facilities_by_type, count, False, use_hotspots, objective, decay, weights, use_capacity
+            )
+
+    def to_feature_collection(self, results: List[Dict]) -> Dict:
+        """
+        Собирает результаты по всем типам в один GeoJSON FeatureCollection
+        """
+        features = []
+        scores = {}
+        for result in results:
+            facility_type = result["facility_type"]
+            total = result["total_population"]
+            for i, location in enumerate(result["locations"]):
+                features.append({
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [location["longitude"], location["latitude"]]
+                    },
+                    "properties": {
+                        "name": f"{FACILITY_NAMES.get(facility_type, facility_type)} #{i + 1}",
+                        "type": "recommendation",
+                        "facility_type": facility_type,
+                        "h3": location["h3"],
+                        "covered_population": location["covered_population"],
+                        "score": location["covered_population"] / total if total else 0.0,
+                    }
+                })
+            scores[facility_type] = {
+                "coverage_before": result["covered_before"] / total if total else 0.0,
+                "coverage_after": result["covered_after"] / total if total else 0.0,
+                "improvement_score": result["improvement_score"],
+            }
+            if "objective" in result:
+                scores[facility_type]["objective_before"] = result["objective_before"]
+                scores[facility_type]["objective_after"] = result["objective_after"]
+            if "overloaded_facilities" in result:
+                scores[facility_type]["overloaded_facilities"] = result["overloaded_facilities"]
+
+        return {
+            "type": "FeatureCollection",
+            "features": features,
+            "scores": scores,
+        }
@@ -0,0 +1,177 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import h3
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from services.columnar_store import ColumnarStore, STORE_PATH
+
+# Средний радиус Земли (км) для перевода расстояний в радианы haversine-метрики
+EARTH_RADIUS_KM = 6371.0088
+
+# Слой населения по умолчанию: H3-гексагоны Бишкека с численностью населения
+POPULATION_PATH = os.getenv(
+    "POPULATION_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data to load",
+        "bishkek_filtered.geojson",
+    ),
+)
+
+
+def km_to_radians(distance_km: float) -> float:
+    """
+    Переводит расстояние в километрах в радианы для BallTree с метрикой haversine
+    """
+    return distance_km / EARTH_RADIUS_KM
+
+
+class PopulationLayer:
+    """
+    Слой спроса: центроиды H3-гексагонов и население в них.
+    Хранится в виде numpy-массивов, выровненных по одному индексу.
+    Индексы H3 - строки, либо uint64 при загрузке из колоночного хранилища.
+    """
+
+    def __init__(self, h3_ids: np.ndarray, lat: np.ndarray, lon: np.ndarray, population: np.ndarray):
+        self.h3_ids = h3_ids
+        self.lat = lat
+        self.lon = lon
+        self.population = population
+        self._tree: Optional[BallTree] = None
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.population)
+
+    def cell_id(self, index: int) -> str:
+        """Строковый индекс H3 гексагона"""
+        cell = self.h3_ids[index]
+        return h3.int_to_str(int(cell)) if isinstance(cell, np.integer) else cell
+
+    @property
+    def positions(self) -> Dict[str, int]:
+        """Строковый индекс H3 -> позиция гексагона в массивах слоя"""
+        if self._positions is None:
+            self._positions = {self.cell_id(i): i for i in range(len(self))}
+        return self._positions
+
+    @property
+    def coords_rad(self) -> np.ndarray:
+        """Координаты центроидов (lat, lon) в радианах"""
+        return np.radians(np.column_stack([self.lat, self.lon]))
+
+    @property
+    def tree(self) -> BallTree:
+        """
+        Пространственный индекс по центроидам (строится один раз и переиспользуется)
+        """
+        if self._tree is None:
+            self._tree = BallTree(self.coords_rad, metric="haversine")
+        return self._tree
+
+    def cells_within(self, lat: np.ndarray, lon: np.ndarray, radius_km: float) -> np.ndarray:
+        """
+        Для каждой точки возвращает индексы гексагонов в пределах радиуса
+
+        :param lat: Массив широт
+        :param lon: Массив долгот
+        :param radius_km: Радиус в километрах
+        :return: Массив (dtype=object) массивов индексов
+        """
+        if len(lat) == 0:
+            return np.empty(0, dtype=object)
+        points = np.radians(np.column_stack([lat, lon]))
+        return self.tree.query_radius(points, r=km_to_radians(radius_km))
+
+    def cells_within_distance(self, lat: np.ndarray, lon: np.ndarray, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        То же, что cells_within, но дополнительно возвращает расстояния до гексагонов
+
+        :return: Массивы (dtype=object) индексов и расстояний в км
+        """
+        if len(lat) == 0:
+            return np.empty(0, dtype=object), np.empty(0, dtype=object)
+        points = np.radians(np.column_stack([lat, lon]))
+        indices, distances = self.tree.query_radius(points, r=km_to_radians(radius_km), return_distance=True)
+        return indices, distances * EARTH_RADIUS_KM
+
+    def covered_mask(self, lat: np.ndarray, lon: np.ndarray, radius_km: float) -> np.ndarray:
+        """
+        Булева маска гексагонов, попадающих в радиус хотя бы одной из точек
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        for idx in self.cells_within(lat, lon, radius_km):
+            mask[idx] = True
+        return mask
+
+
+def read_population_geojson(path: str) -> PopulationLayer:
+    """
+    Читает GeoJSON с H3-гексагонами (свойства h3 и population)
+
+    :param path: Путь к файлу
+    :return: PopulationLayer
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    h3_ids = []
+    population = []
+    for feature in data.get("features", []):
+        properties = feature.get("properties") or {}
+        if not properties.get("h3"):
+            continue
+        h3_ids.append(properties["h3"])
+        population.append(float(properties.get("population") or 0))
+
+    # Центроиды берем из самого H3-индекса, а не из геометрии (она может быть в EPSG:3857)
+    latlng = np.array([h3.cell_to_latlng(cell) for cell in h3_ids], dtype=np.float64).reshape(-1, 2)
+
+    return PopulationLayer(
+        h3_ids=np.array(h3_ids, dtype=object),
+        lat=latlng[:, 0],
+        lon=latlng[:, 1],
+        population=np.array(population, dtype=np.float64),
+    )
+
+
+def read_population_store(path: str) -> PopulationLayer:
+    """
+    Открывает слой населения из колоночного хранилища (массивы отображаются в память, без копирования)
+    """
+    columns = ColumnarStore(path).read_population()
+    return PopulationLayer(
+        h3_ids=columns["h3"],
+        lat=columns["lat"],
+        lon=columns["lon"],
+        population=columns["population"],
+    )
+
+
+def read_population_layer(path: Optional[str] = None) -> PopulationLayer:
+    """
+    Читает слой населения без кэширования (реестр регионов сам управляет временем жизни слоев).
+    Без пути используется колоночное хранилище, если оно собрано, иначе GeoJSON.
+
+    :param path: Каталог колоночного хранилища или путь к GeoJSON
+    """
+    if path is None:
+        path = STORE_PATH if ColumnarStore(STORE_PATH).exists() else POPULATION_PATH
+    if os.path.isdir(path):
+        return read_population_store(path)
+    return read_population_geojson(path)
+
+
+@lru_cache(maxsize=None)
+def load_population_layer(path: Optional[str] = None) -> PopulationLayer:
+    """
+    Загружает слой населения один раз на процесс
+
+    :param path: Каталог колоночного хранилища или путь к GeoJSON
+    """
+    return read_population_layer(path)
@@ -0,0 +1,333 @@
+"""
+Реестр регионов: граница, метрическая СК, слой населения и граф соседства гексагонов.
+
+Описание региона легкое и доступно сразу; тяжелые данные (слой населения, индексы,
+сервисы покрытия и размещения) загружаются при первом обращении и вытесняются
+по принципу LRU, поэтому в памяти процесса одновременно не больше REGION_CACHE_SIZE регионов.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Polygon, shape
+from shapely.ops import unary_union
+
+from constants.facilities import DEFAULT_REGION, PRIORITY_ZONES, REGIONS
+from services.population_service import PopulationLayer, read_population_layer
+from utils.metrics import timed
+from utils.projection import local_metric_crs
+from utils.workers import in_pool_process
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# JSON-файл с дополнительными регионами в формате REGIONS
+REGIONS_PATH = os.getenv("REGIONS_PATH")
+
+# Сколько регионов держать загруженными в одном рабочем процессе. Процессы пула расчетов
+# (utils.workers) регионы не загружают, а пользуются унаследованными при fork страницами,
+# поэтому на рабочий процесс вместе с его пулом приходится не больше REGION_CACHE_SIZE регионов
+# (плюс вытесненные рабочим процессом, пока живы процессы пула, унаследовавшие их)
+REGION_CACHE_SIZE = int(os.getenv("REGION_CACHE_SIZE", "2"))
+
+
+class RegionNotInherited(RuntimeError):
+    """
+    Регион не был загружен до запуска пула процессов; процесс пула его не загружает,
+    расчет нужно выполнить в рабочем процессе
+    """
+
+
+def read_boundary(path: str):
+    """
+    Читает границу региона: city_polygon.json (строки "lat, lon") или GeoJSON
+
+    :return: Polygon или MultiPolygon в координатах (lon, lat)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    geometry = data.get("geometry")
+    if isinstance(geometry, list):
+        points = [tuple(float(v) for v in item.split(",")) for item in geometry]
+        return Polygon([(lon, lat) for lat, lon in points])
+
+    if data.get("type") == "FeatureCollection":
+        geometries = [shape(feature["geometry"]) for feature in data.get("features", []) if feature.get("geometry")]
+    elif data.get("type") == "Feature":
+        geometries = [shape(geometry)]
+    else:
+        geometries = [shape(data)]
+    boundary = unary_union(geometries)
+    if not isinstance(boundary, (Polygon, MultiPolygon)):
+        raise ValueError(f"Region boundary in {path} is not a polygon")
+    return boundary
+
+
+# Объекты с блокировками: после fork блокировки пересоздаются, так как fork мог произойти,
+# пока их держал другой поток, и в дочернем процессе их никто бы не освободил
+_instances: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _reset_locks_after_fork() -> None:
+    for instance in list(_instances):
+        instance._reset_locks()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+class Region:
+    """
+    Описание региона (без тяжелых данных)
+    """
+
+    def __init__(self,
+                 key: str,
+                 name: str,
+                 boundary: str,
+                 population: Optional[str] = None,
+                 crs: Optional[str] = None):
+        self.key = key
+        self.name = name
+        self.boundary_path = boundary if os.path.isabs(boundary) else os.path.join(BACKEND_DIR, boundary)
+        self.population_path = population
+        if population and not os.path.isabs(population):
+            self.population_path = os.path.join(BACKEND_DIR, population)
+        self._crs = crs
+        self._boundary = None
+
+    @property
+    def boundary(self):
+        if self._boundary is None:
+            self._boundary = read_boundary(self.boundary_path)
+        return self._boundary
+
+    @property
+    def boundary_coordinates(self) -> List[List[float]]:
+        """
+        Внешний контур границы в формате [[longitude, latitude], ...] (для промптов AI).
+        Для мультиполигона берется крупнейшая часть.
+        """
+        polygon = self.boundary
+        if isinstance(polygon, MultiPolygon):
+            polygon = max(polygon.geoms, key=lambda p: p.area)
+        coords = list(polygon.exterior.coords)
+        # Замыкающую точку не повторяем, как и в исходном полигоне города
+        if len(coords) > 1 and coords[0] == coords[-1]:
+            coords = coords[:-1]
+        return [[round(lon, 6), round(lat, 6)] for lon, lat in coords]
+
+    @property
+    def crs(self) -> str:
+        """
+        Метрическая СК региона: заданная в реестре или локальная по центру границы
+        """
+        if self._crs is None:
+            center = self.boundary.centroid
+            self._crs = local_metric_crs(center.x, center.y)
+        return self._crs
+
+    @property
+    def priority_zones(self) -> List[Dict]:
+        return PRIORITY_ZONES.get(self.key, [])
+
+    def bbox(self, margin_km: float = 0.0) -> Tuple[float, float, float, float]:
+        """
+        Границы региона (min_lon, min_lat, max_lon, max_lat), расширенные на margin_km
+        """
+        min_lon, min_lat, max_lon, max_lat = self.boundary.bounds
+        margin_lat = margin_km / 111.0
+        margin_lon = margin_km / (111.0 * max(0.1, math.cos(math.radians((min_lat + max_lat) / 2))))
+        return min_lon - margin_lon, min_lat - margin_lat, max_lon + margin_lon, max_lat + margin_lat
+
+    def bbox_mask(self, points: np.ndarray, margin_km: float = 0.0) -> np.ndarray:
+        """
+        Маска точек (N, 2) в формате (lat, lon), попадающих в границы региона с запасом margin_km
+        """
+        min_lon, min_lat, max_lon, max_lat = self.bbox(margin_km)
+        lat, lon = points[:, 0], points[:, 1]
+        return (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+
+
+class RegionData:
+    """
+    Тяжелые данные региона: слой населения с пространственным индексом и сервисы поверх него
+    """
+
+    def __init__(self, region: Region):
+        self.region = region
+        with timed("region.load"):
+            self.layer: PopulationLayer = read_population_layer(region.population_path)
+            self.layer.tree
+        self._coverage = None
+        self._placement = None
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+    @property
+    def coverage(self):
+        from services.coverage_service import CoverageService
+        with self._lock:
+            if self._coverage is None:
+                self._coverage = CoverageService(self.layer, region=self.region.key)
+            return self._coverage
+
+    @property
+    def placement(self):
+        from services.placement_service import PlacementService
+        with self._lock:
+            if self._placement is None:
+                self._placement = PlacementService(self.layer, region=self.region.key)
+            return self._placement
+
+    @property
+    def graph(self):
+        """
+        Граф соседства гексагонов региона (строится при первом обращении)
+        """
+        return self.coverage.adjacency
+
+    def _reset_locks(self) -> None:
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        """
+        Строит все лениво создаваемые структуры региона: граница, СК, индексы, граф соседства,
+        маски приоритетных зон и матрицы расстояний для радиусов всех типов объектов.
+        Вызывается перед fork, чтобы рабочие процессы получили их готовыми.
+        """
+        from constants.facilities import COVERAGE_RADIUS, PLACEMENT_OBJECTIVES
+        from services.objective_service import get_objective
+
+        with timed("region.warm"):
+            self.region.boundary_coordinates
+            self.region.crs
+            self.layer.positions
+            self.graph
+            for zone in self.region.priority_zones:
+                self.placement.weights.zone_mask(zone)
+            for radius_km in sorted(set(COVERAGE_RADIUS.values())):
+                for objective in PLACEMENT_OBJECTIVES:
+                    get_objective(self.layer, radius_km, objective)
+
+
+class RegionRegistry:
+    def __init__(self, regions: Dict[str, Region], max_loaded: int = REGION_CACHE_SIZE):
+        self.regions = regions
+        self.max_loaded = max(1, max_loaded)
+        self._loaded: "OrderedDict[str, RegionData]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Отдельная блокировка на загрузку каждого региона: загрузка одного не блокирует остальные
+        self._loading: Dict[str, threading.Lock] = {key: threading.Lock() for key in regions}
+        _instances.add(self)
+
+    def _reset_locks(self) -> None:
+        self._lock = threading.Lock()
+        self._loading = {key: threading.Lock() for key in self.regions}
+
+    def keys(self) -> List[str]:
+        return list(self.regions)
+
+    def get(self, key: str) -> Region:
+        """
+        :raises KeyError: Регион не зарегистрирован
+        """
+        if key not in self.regions:
+            raise KeyError(f"Unknown region: {key}")
+        return self.regions[key]
+
+    def loaded(self) -> List[RegionData]:
+        """
+        Уже загруженные регионы (без загрузки новых)
+        """
+        with self._lock:
+            return list(self._loaded.values())
+
+    def data(self, key: str) -> RegionData:
+        """
+        Данные региона; при необходимости загружает их и вытесняет давно не использованные регионы
+        """
+        region = self.get(key)
+        if in_pool_process():
+            # Процесс пула не загружает регионы сам: иначе на каждый процесс пула пришлось бы
+            # по REGION_CACHE_SIZE собственных копий
+            with self._lock:
+                data = self._loaded.get(key)
+            if data is None:
+                raise RegionNotInherited(key)
+            return data
+        with self._loading[key]:
+            with self._lock:
+                data = self._loaded.get(key)
+                if data is not None:
+                    self._loaded.move_to_end(key)
+                    return data
+            data = RegionData(region)
+            with self._lock:
+                self._loaded[key] = data
+                while len(self._loaded) > self.max_loaded:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    logger.info("Region %s evicted from memory", evicted)
+            return data
+
+
+def load_regions(path: Optional[str] = REGIONS_PATH) -> Dict[str, Region]:
+    """
+    Регионы из constants.facilities.REGIONS и, если задан, из JSON-файла REGIONS_PATH
+    """
+    config = dict(REGIONS)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    return {key: Region(key=key, **options) for key, options in config.items()}
+
+
+_registry: Optional[RegionRegistry] = None
+
+
+def get_region_registry() -> RegionRegistry:
+    global _registry
+    if _registry is None:
+        _registry = RegionRegistry(load_regions())
+    return _registry
+
+
+def preload_regions(keys: Optional[List[str]] = None) -> List[RegionData]:
+    """
+    Загружает и прогревает регионы в текущем процессе (в мастер-процессе gunicorn до запуска рабочих)
+
+    :param keys: Ключи регионов; по умолчанию - из PRELOAD_REGIONS или DEFAULT_REGION
+    """
+    registry = get_region_registry()
+    if keys is None:
+        keys = [k.strip() for k in os.getenv("PRELOAD_REGIONS", DEFAULT_REGION).split(",") if k.strip()]
+    if len(keys) > registry.max_loaded:
+        logger.warning(
+            "PRELOAD_REGIONS lists %d regions, but only %d fit into REGION_CACHE_SIZE", len(keys), registry.max_loaded
+        )
+        keys = keys[:registry.max_loaded]
+    loaded = []
+    for key in keys:
+        data = registry.data(key)
+        data.warm()
+        loaded.append(data)
+        logger.info("Region %s preloaded: %d cells", key, len(data.layer))
+    return loaded
+
+
+def get_region_data(region: str = DEFAULT_REGION) -> RegionData:
+    """
+    Данные региона из общего для процесса реестра
+
+    :raises KeyError: Регион не зарегистрирован
+    """
+    return get_region_registry().data(region)
@@ -0,0 +1,108 @@
+from typing import Dict, Optional
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from services.population_service import EARTH_RADIUS_KM, PopulationLayer
+from services.region_service import get_region_data
+
+
+def flatten_neighbours(neighbours: np.ndarray):
+    """
+    Плоское представление списков индексов для np.add.reduceat
+    """
+    lengths = np.fromiter((len(n) for n in neighbours), dtype=np.int64, count=len(neighbours))
+    flat = np.concatenate(neighbours).astype(np.int64) if len(neighbours) else np.empty(0, dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(lengths) else lengths
+    return flat, offsets, lengths
+
+
+def sum_by_candidate(values: np.ndarray, flat: np.ndarray, offsets: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Сумма values по гексагонам каждого кандидата
+    """
+    sums = np.zeros(len(lengths))
+    # reduceat некорректно обрабатывает пустые отрезки, поэтому суммируем только непустые
+    non_empty = lengths > 0
+    if non_empty.any():
+        sums[non_empty] = np.add.reduceat(values[flat], offsets[non_empty])
+    return sums
+
+
+def score_candidates(layer: PopulationLayer,
+                     candidates: np.ndarray,
+                     facilities: np.ndarray,
+                     radius_km: float,
+                     covered: Optional[np.ndarray] = None) -> Dict:
+    """
+    Оценивает произвольный набор точек-кандидатов за один векторный проход
+
+    :param layer: Слой населения
+    :param candidates: Массив (M, 2) координат кандидатов (lat, lon)
+    :param facilities: Массив (N, 2) координат существующих объектов (lat, lon)
+    :param radius_km: Радиус охвата в км
+    :param covered: Готовая маска покрытых гексагонов (например, из CoverageIndex)
+    :return: Массивы показателей по кандидатам и общий показатель улучшения
+    """
+    population = layer.population
+    if covered is None:
+        covered = layer.covered_mask(facilities[:, 0], facilities[:, 1], radius_km)
+    uncovered_population = np.where(covered, 0.0, population)
+    uncovered_total = float(uncovered_population.sum())
+
+    neighbours = layer.cells_within(candidates[:, 0], candidates[:, 1], radius_km)
+    flat, offsets, lengths = flatten_neighbours(neighbours)
+
+    # Население в радиусе и та его часть, которая сейчас без покрытия
+    reach = sum_by_candidate(population, flat, offsets, lengths)
+    marginal = sum_by_candidate(uncovered_population, flat, offsets, lengths)
+    overlap = np.divide(reach - marginal, reach, out=np.zeros_like(reach), where=reach > 0)
+
+    # Расстояние до ближайшего существующего объекта
+    if len(facilities):
+        tree = BallTree(np.radians(facilities), metric="haversine")
+        distance, _ = tree.query(np.radians(candidates), k=1)
+        nearest_km = distance[:, 0] * EARTH_RADIUS_KM
+    else:
+        nearest_km = np.full(len(candidates), np.inf)
+
+    # Совместный эффект: кандидаты могут покрывать одни и те же гексагоны
+    joint = np.zeros(len(population), dtype=bool)
+    joint[flat] = True
+    joint_marginal = float(uncovered_population[joint].sum())
+
+    return {
+        "reach_population": reach,
+        "marginal_population": marginal,
+        "overlap": overlap,
+        "nearest_facility_km": nearest_km,
+        # Относительная оценка 0..1 (лучший кандидат набора - 1.0), как и прежнее поле score
+        "score": marginal / marginal.max() if len(marginal) and marginal.max() > 0 else np.zeros(len(candidates)),
+        # Доля всего непокрытого сейчас населения, которую покроет кандидат
+        "uncovered_share": marginal / uncovered_total if uncovered_total > 0 else np.zeros(len(candidates)),
+        "joint_marginal_population": joint_marginal,
+        "improvement_score": joint_marginal / uncovered_total * 100 if uncovered_total > 0 else 0.0,
+    }
+
+
+def region_scores(region: str, candidates: np.ndarray, facilities: np.ndarray, radius_km: float) -> Dict:
+    """
+    score_candidates по слою населения региона.
+    Точка входа для пула процессов: слой населения берется из реестра регионов процесса.
+    """
+    return score_candidates(get_region_data(region).layer, candidates, facilities, radius_km)
+
+
+def score_properties(scores: Dict, i: int) -> Dict:
+    """
+    Показатели i-го кандидата в виде свойств GeoJSON Feature
+    """
+    nearest = float(scores["nearest_facility_km"][i])
+    return {
+        "score": float(scores["score"][i]),
+        "uncovered_share": float(scores["uncovered_share"][i]),
+        "marginal_population": float(scores["marginal_population"][i]),
+        "reach_population": float(scores["reach_population"][i]),
+        "overlap": float(scores["overlap"][i]),
+        "nearest_facility_km": nearest if np.isfinite(nearest) else None,
+    }
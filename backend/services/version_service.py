@@ -0,0 +1,135 @@
+"""
+Версии данных об объектах и снимки на заданную версию.
+
+Снимок строится от текущего состояния таблицы facilities с откатом изменений
+из ленты facility_changes, сделанных после нужной версии. Лента читается после
+таблицы, поэтому изменения, зафиксированные между двумя запросами, тоже откатываются.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from models.database import DataVersionModel, FacilityChangeModel, FacilityModel, FACILITIES_VERSION
+from utils.metrics import timed
+
+
+def current_version(db: Session) -> int:
+    """
+    Текущая версия данных об объектах (растет на 1 с каждым изменением)
+    """
+    version = db.query(DataVersionModel.version).filter(
+        DataVersionModel.name == FACILITIES_VERSION
+    ).scalar() # type: ignore
+    return int(version or 0)
+
+
+def resolve_version(db: Session, version: Optional[int] = None) -> int:
+    """
+    Проверяет запрошенную версию; без версии - текущая
+
+    :raises ValueError: Версия из будущего или отрицательная
+    """
+    current = current_version(db)
+    if version is None:
+        return current
+    if version < 0 or version > current:
+        raise ValueError(f"Data version {version} is out of range 0..{current}")
+    return version
+
+
+def changes_between(db: Session,
+                    from_version: int,
+                    to_version: Optional[int] = None,
+                    facility_types: Optional[Iterable[str]] = None,
+                    limit: Optional[int] = None) -> List[FacilityChangeModel]:
+    """
+    Изменения с версиями в интервале (from_version, to_version] по возрастанию версии
+    """
+    query = db.query(FacilityChangeModel).filter(FacilityChangeModel.version > from_version)
+    if to_version is not None:
+        query = query.filter(FacilityChangeModel.version <= to_version)
+    if facility_types is not None:
+        types = list(facility_types)
+        query = query.filter(or_(
+            FacilityChangeModel.facility_type.in_(types),
+            FacilityChangeModel.old_facility_type.in_(types)
+        ))
+    query = query.order_by(FacilityChangeModel.version, FacilityChangeModel.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all() # type: ignore
+
+
+def load_snapshot(db: Session, version: int, facility_types: Iterable[str]) -> Dict[int, Dict]:
+    """
+    Объекты заданных типов по состоянию на версию version
+
+    :return: id объекта -> {facility_type, latitude, longitude}
+    """
+    types = list(facility_types)
+    with timed("db.snapshot.query"):
+        rows = db.query(
+            FacilityModel.id, FacilityModel.facility_type, FacilityModel.latitude, FacilityModel.longitude
+        ).filter(FacilityModel.facility_type.in_(types)).all() # type: ignore
+        changes = changes_between(db, version, facility_types=types)
+
+    wanted = set(types)
+    snapshot = {
+        facility_id: {"facility_type": facility_type, "latitude": latitude, "longitude": longitude}
+        for facility_id, facility_type, latitude, longitude in rows
+    }
+    # Откатываем изменения от новых к старым
+    for change in reversed(changes):
+        if change.operation == "insert":
+            snapshot.pop(change.facility_id, None)
+        elif change.old_facility_type in wanted:
+            snapshot[change.facility_id] = {
+                "facility_type": change.old_facility_type,
+                "latitude": change.old_latitude,
+                "longitude": change.old_longitude,
+            }
+        else:
+            snapshot.pop(change.facility_id, None)
+    return snapshot
+
+
+def snapshot_coordinates(db: Session, version: int, facility_types: Iterable[str]) -> Dict[str, np.ndarray]:
+    """
+    Координаты объектов на версию version, сгруппированные по типу
+
+    :return: Тип объекта -> массив (N, 2) координат (lat, lon)
+    """
+    types = list(facility_types)
+    grouped: Dict[str, List] = {t: [] for t in types}
+    for facility in load_snapshot(db, version, types).values():
+        grouped[facility["facility_type"]].append((facility["latitude"], facility["longitude"]))
+    return {t: np.array(coords, dtype=np.float64).reshape(-1, 2) for t, coords in grouped.items()}
+
+
+def change_to_dict(change: FacilityChangeModel) -> Dict:
+    return {
+        "version": change.version,
+        "facility_id": change.facility_id,
+        "operation": change.operation,
+        "facility_type": change.facility_type,
+        "latitude": change.latitude,
+        "longitude": change.longitude,
+        "old_facility_type": change.old_facility_type,
+        "old_latitude": change.old_latitude,
+        "old_longitude": change.old_longitude,
+        "changed_at": change.changed_at.isoformat() if change.changed_at else None,
+    }
+
+
+def last_change_version(db: Session, version: int, facility_type: str) -> int:
+    """
+    Последняя версия не позже version, в которой менялись объекты данного типа.
+    Кэши по типу, привязанные к этой версии, не сбрасываются изменениями других типов.
+    """
+    last = db.query(func.max(FacilityChangeModel.version)).filter(
+        FacilityChangeModel.version <= version,
+        or_(FacilityChangeModel.facility_type == facility_type, FacilityChangeModel.old_facility_type == facility_type)
+    ).scalar() # type: ignore
+    return int(last or 0)
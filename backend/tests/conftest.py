@@ -0,0 +1,87 @@
+"""
+Общие фикстуры тестов: временная SQLite вместо MySQL и синтетические слои населения
+"""
+import os
+import tempfile
+
+# Подключение к БД задается до импорта models.database - движок создается при импорте
+_DB_DIR = tempfile.mkdtemp(prefix="haka-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+
+import json
+from typing import Dict, List, Tuple
+
+import h3
+import numpy as np
+import pytest
+from sqlalchemy import update
+
+from models.database import (
+    CoverageSummaryModel, DataVersionModel, FacilityChangeModel, FacilityModel, FACILITIES_VERSION, SessionLocal
+)
+from services import region_service
+from services.population_service import PopulationLayer
+from services.region_service import Region, RegionRegistry
+from utils.workers import shutdown_process_pool
+
+
+def make_layer(points: List[Tuple[float, float]], population: List[float]) -> PopulationLayer:
+    """
+    Слой населения из точек (lat, lon): каждая точка - отдельный гексагон H3 8-го разрешения
+    """
+    lat = np.array([p[0] for p in points], dtype=np.float64)
+    lon = np.array([p[1] for p in points], dtype=np.float64)
+    h3_ids = np.array([h3.latlng_to_cell(a, b, 8) for a, b in points], dtype=object)
+    return PopulationLayer(h3_ids, lat, lon, np.array(population, dtype=np.float64))
+
+
+@pytest.fixture
+def db():
+    """
+    Сессия пустой БД: объекты, лента изменений и сводки очищаются, версия данных - 0
+    """
+    session = SessionLocal()
+    for model in (FacilityModel, FacilityChangeModel, CoverageSummaryModel):
+        session.query(model).delete()
+    session.execute(
+        update(DataVersionModel).where(DataVersionModel.name == FACILITIES_VERSION).values(version=0)
+    )
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def register_region(tmp_path, monkeypatch):
+    """
+    Регистрирует регион "test" из синтетического слоя: индекс H3 -> население.
+    Граница - прямоугольник вокруг гексагонов с запасом ~5 км.
+    Пул процессов перезапускается, чтобы его процессы унаследовали новый реестр регионов.
+    """
+    def register(cells: Dict[str, float]) -> str:
+        population_path = tmp_path / "population.geojson"
+        population_path.write_text(json.dumps({
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": None, "properties": {"h3": cell, "population": value}}
+                for cell, value in cells.items()
+            ],
+        }), encoding="utf-8")
+        points = [h3.cell_to_latlng(cell) for cell in cells]
+        south, north = min(p[0] for p in points) - 0.05, max(p[0] for p in points) + 0.05
+        west, east = min(p[1] for p in points) - 0.05, max(p[1] for p in points) + 0.05
+        boundary_path = tmp_path / "boundary.json"
+        boundary_path.write_text(json.dumps({
+            "geometry": [f"{lat}, {lon}" for lat, lon in [(south, west), (south, east), (north, east), (north, west)]]
+        }), encoding="utf-8")
+
+        shutdown_process_pool()
+        monkeypatch.setattr(region_service, "_registry", RegionRegistry({
+            "test": Region("test", "Тест", str(boundary_path), population=str(population_path))
+        }))
+        return "test"
+
+    yield register
+    shutdown_process_pool()
@@ -0,0 +1,150 @@
+import json
+import re
+
+import h3
+import pytest
+import requests
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import ai_recommendations
+from routers.ai_recommendations import router
+from tests.test_scoring_service import A, B, CELLS
+from utils import workers
+
+REQUEST = {
+    "target_facility_type": "school",
+    "recommendations_count": 1,
+    "existing_facilities": [{"type": "school", "coordinates": [74.6, 42.87], "name": "Школа №1"}],
+}
+
+
+class FakeOpenAIResponse:
+    def __init__(self, status_code: int, content: str = ""):
+        self.status_code = status_code
+        self.text = content
+        self._content = content
+
+    def json(self):
+        return {"choices": [{"message": {"content": self._content}}]}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="")
+    return TestClient(app)
+
+
+@pytest.fixture
+def openai(monkeypatch):
+    """
+    Подменяет запрос к OpenAI; calls - переданные в requests.post тела запросов
+    """
+    calls = []
+
+    def respond_with(response):
+        def post(url, headers=None, json=None, **kwargs):
+            calls.append(json)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        monkeypatch.setattr(ai_recommendations.requests, "post", post)
+        return calls
+
+    return respond_with
+
+
+def test_openai_error_is_bad_gateway(client, openai, db):
+    calls = openai(FakeOpenAIResponse(401, '{"error": "invalid api key"}'))
+    response = client.post("/ai/recommend", json=REQUEST)
+
+    assert len(calls) == 1
+    assert response.status_code == 502
+    assert "OpenAI request failed" in response.json()["detail"]
+
+
+def test_openai_unreachable_is_bad_gateway(client, openai, db):
+    openai(requests.ConnectionError("connection refused"))
+    response = client.post("/ai/recommend", json=REQUEST)
+
+    assert response.status_code == 502
+
+
+def test_answer_without_coordinates(client, openai, db):
+    openai(FakeOpenAIResponse(200, "Извините, не могу помочь"))
+    response = client.post("/ai/recommend", json=REQUEST)
+
+    assert response.status_code == 200
+    assert response.json()["features"] == []
+
+
+def test_unknown_region(client, openai, db):
+    calls = openai(FakeOpenAIResponse(200, ""))
+    response = client.post("/ai/recommend", json={**REQUEST, "region": "atlantis"})
+
+    assert response.status_code == 404
+    assert calls == []
+
+
+def hotspots_in_prompt(call) -> list:
+    prompt = call["messages"][1]["content"]
+    block = re.search(r"UNCOVERED DEMAND HOTSPOTS.*?:\n(\[.*?\])\n\nMANDATORY", prompt, re.S).group(1)
+    return json.loads(block)
+
+
+def test_prompt_lists_uncovered_hotspots(client, openai, db, register_region, monkeypatch):
+    region = register_region(CELLS)
+    pool_calls = []
+    run_in_process = workers.run_in_process
+
+    async def counting_run_in_process(func, *args, **kwargs):
+        pool_calls.append(func.__name__)
+        return await run_in_process(func, *args, **kwargs)
+
+    monkeypatch.setattr(ai_recommendations, "run_in_process", counting_run_in_process)
+    calls = openai(FakeOpenAIResponse(200, ""))
+    request = {**REQUEST, "region": region, "existing_facilities": [{"type": "school", "coordinates": [B[1], B[0]]}]}
+    response = client.post("/ai/recommend", json=request)
+
+    assert response.status_code == 200
+    # Кластеризация - в пуле процессов; B покрыт школой, в промпт попадает только кластер A
+    assert "region_hotspots" in pool_calls
+    hotspots = hotspots_in_prompt(calls[0])
+    assert sum(h["population"] for h in hotspots) == 7000
+    for h in hotspots:
+        assert h["coordinates"][1] == pytest.approx(A[0], abs=0.02)
+        assert h["coordinates"][0] == pytest.approx(A[1], abs=0.02)
+
+
+def test_recommendations_are_scored(client, openai, db, register_region):
+    region = register_region(CELLS)
+    answer = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {"name": name, "facility_type": "school", "score": 0.42},
+            }
+            for name, (lat, lon) in (("A", A), ("B", B))
+        ],
+    }
+    openai(FakeOpenAIResponse(200, f"```json\n{json.dumps(answer)}\n```"))
+    request = {
+        **REQUEST, "region": region, "recommendations_count": 2,
+        "existing_facilities": [{"type": "school", "coordinates": [B[1], B[0]]}],
+    }
+    response = client.post("/ai/recommend", json=request)
+
+    assert response.status_code == 200
+    data = response.json()
+    # Оценки - по слою населения региона, а не из ответа модели
+    assert data["improvement_score"] == pytest.approx(100.0)
+    first, second = (f["properties"] for f in data["features"])
+    assert first["name"] == "A"
+    assert (first["score"], first["uncovered_share"], first["overlap"]) == (1.0, 1.0, 0.0)
+    assert first["marginal_population"] == 7000
+    assert first["nearest_facility_km"] == pytest.approx(h3.great_circle_distance(A, B, unit="km"), abs=1e-3)
+    assert (second["score"], second["marginal_population"], second["overlap"]) == (0.0, 0, 1.0)
+    assert second["nearest_facility_km"] == pytest.approx(0.0, abs=1e-3)
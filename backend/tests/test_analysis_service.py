@@ -0,0 +1,82 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import Point, box
+
+from services import analysis_service
+from services.analysis_service import AnalysisService, region_hotspots
+from services.capacity_service import region_load
+from services.placement_service import PlacementService
+from services.region_service import Region, get_region_data
+from tests.test_scoring_service import A, CELLS
+
+UTM_43N = "EPSG:32643"
+
+
+@pytest.fixture
+def metric_crs(monkeypatch):
+    """
+    Записывает СК, в которой кластеризуются гексагоны
+    """
+    used = []
+    to_metric = analysis_service.to_metric
+
+    def recording_to_metric(lon, lat, crs=None):
+        x, y, crs = to_metric(lon, lat, crs=crs)
+        used.append(crs)
+        return x, y, crs
+
+    monkeypatch.setattr(analysis_service, "to_metric", recording_to_metric)
+    return used
+
+
+def test_region_crs_from_config(tmp_path):
+    region = Region("test", "Тест", str(tmp_path / "boundary.json"), crs=UTM_43N)
+    assert region.crs == UTM_43N
+
+
+def test_hotspots_in_region_crs(register_region, metric_crs):
+    region = register_region(CELLS)
+    data = get_region_data(region)
+    data.region._crs = UTM_43N
+
+    hotspots = region_hotspots(region, np.zeros((0, 2)), radius_km=2)
+    assignment, overload = region_load(region, np.zeros((0, 2)), 1000.0, radius_km=2)
+    PlacementService(data.layer, region=region).plan(
+        {"school": np.zeros((0, 2)), "clinic": np.zeros((0, 2))}, count=1, parallel=False, use_hotspots=True
+    )
+
+    assert metric_crs == [UTM_43N] * 4
+    assert sum(h["population"] for h in hotspots) == sum(CELLS.values())
+    assert sum(h["population"] for h in overload) == sum(CELLS.values())
+
+
+def test_hotspot_centroids_do_not_depend_on_crs(register_region):
+    region = register_region(CELLS)
+    layer = get_region_data(region).layer
+    service = AnalysisService()
+
+    # Без max_radius: сетка нарезки крупных кластеров привязана к началу координат СК
+    default = service.find_demand_hotspots(layer)
+    utm = service.find_demand_hotspots(layer, crs=UTM_43N)
+
+    assert [h["population"] for h in default] == [7000, 3000]
+    assert len(default) == len(utm)
+    for a, b in zip(default, utm):
+        assert a["population"] == b["population"]
+        assert (a["latitude"], a["longitude"]) == (pytest.approx(b["latitude"], abs=1e-4), pytest.approx(b["longitude"], abs=1e-4))
+
+
+def test_polygon_buffers_in_given_crs():
+    # Квадрат ~200 м вокруг A и буфер 1 км в UTM региона
+    lat, lon = A
+    square = box(lon - 0.001, lat - 0.001, lon + 0.001, lat + 0.001)
+    facilities = gpd.GeoDataFrame(geometry=[square], crs="EPSG:4326")
+
+    areas = AnalysisService().calculate_access_areas(facilities, max_distance=1000, crs=UTM_43N)
+
+    assert areas.crs.equals("EPSG:4326")
+    zone = areas.geometry.iloc[0]
+    # ~0.0083° по широте - это ~920 м от края квадрата, ~0.0110° - ~1.2 км
+    assert zone.contains(Point(lon, lat + 0.001 + 0.0083))
+    assert not zone.contains(Point(lon, lat + 0.001 + 0.0110))
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from services.capacity_service import assign_demand, overload_hotspots
+from tests.conftest import make_layer
+
+# Гексагон A совпадает с объектом F1, B - в 0.5 км к северу, F2 - в 2 км к северу от A
+A = (42.8700, 74.6000)
+B = (42.8745, 74.6000)
+F1 = A
+F2 = (42.8880, 74.6000)
+
+
+@pytest.fixture
+def layer():
+    return make_layer([A, B], [300, 300])
+
+
+def test_overflow_goes_to_next_facility(layer):
+    result = assign_demand(layer, np.array([F1, F2]), np.array([400.0, 1000.0]), radius_km=1)
+
+    # F1 заполняется ближайшими жителями: весь A и 100 жителей B
+    assert result["load"].tolist() == pytest.approx([400, 200])
+    assert result["utilization"].tolist() == pytest.approx([1.0, 0.2])
+    # Без ограничения вместимости все 600 жителей пришли бы к F1
+    assert result["demand_pressure"].tolist() == pytest.approx([1.5, 0.0])
+    # Остаток B ушел к F2 (1.5 км) - дальше радиуса охвата, поэтому не обслужен
+    assert result["overflow"].tolist() == pytest.approx([0, 200])
+    assert result["served_population"] == pytest.approx(400)
+    assert result["assigned_population"] == pytest.approx(600)
+    assert result["total_population"] == 600
+
+
+def test_reach_limits_assignment(layer):
+    result = assign_demand(layer, np.array([F1, F2]), np.array([400.0, 1000.0]), radius_km=1, reach_km=1)
+
+    assert result["load"].tolist() == pytest.approx([400, 0])
+    assert result["overflow"].tolist() == pytest.approx([0, 200])
+    assert result["assigned_population"] == pytest.approx(400)
+
+
+def test_enough_capacity_serves_everyone(layer):
+    result = assign_demand(layer, np.array([F1]), 1000.0, radius_km=1)
+
+    assert result["load"].tolist() == pytest.approx([600])
+    assert result["demand_pressure"].tolist() == pytest.approx([0.6])
+    assert result["overflow"].tolist() == [0, 0]
+    assert result["mean_distance_km"][0] == pytest.approx(0.25, abs=0.01)
+
+
+def test_no_facilities(layer):
+    result = assign_demand(layer, np.zeros((0, 2)), 1000.0, radius_km=1)
+
+    assert result["load"].size == 0
+    assert result["overflow"].tolist() == [300, 300]
+    assert result["served_population"] == 0.0
+
+
+def test_overload_hotspots():
+    # Объект вмещает только жителей A; B рядом, но мест нет; C в ~10 км - вне досягаемости
+    c = (42.9600, 74.6000)
+    layer = make_layer([A, B, c], [3000, 3000, 3000])
+    assignment = assign_demand(layer, np.array([F1]), 3000.0, radius_km=1)
+    hotspots = overload_hotspots(layer, assignment, radius_km=1)
+
+    assert assignment["overflow"].tolist() == pytest.approx([0, 3000, 3000])
+    assert len(hotspots) == 2
+    centres = sorted((h["latitude"], h["population"]) for h in hotspots)
+    assert centres[0] == (pytest.approx(B[0], abs=1e-4), pytest.approx(3000))
+    assert centres[1] == (pytest.approx(c[0], abs=1e-4), pytest.approx(3000))
@@ -0,0 +1,50 @@
+import pytest
+
+from models.database import CoverageSummaryModel
+from services import coverage_service
+from services.coverage_service import CoverageService
+from tests.conftest import make_layer
+from tests.test_version_service import P0, P1, P2, facility
+
+
+@pytest.fixture
+def service():
+    return CoverageService(make_layer([P0, P1, P2], [100, 200, 300]), region="test")
+
+
+def add_schools(db, points):
+    for point in points:
+        db.add(facility("school", point))
+        db.commit()
+
+
+def stored_versions(db):
+    return sorted(v for (v,) in db.query(CoverageSummaryModel.data_version).all())
+
+
+def test_summary_is_materialized_per_version(db, service):
+    add_schools(db, [P0, P1])
+
+    summary = service.get_summary(db, "school")
+    assert summary["data_version"] == 2
+    assert summary["covered_population"] == 300
+    assert summary["coverage_share"] == pytest.approx(0.5)
+
+    # Повторный запрос читается из таблицы, версия - целое число
+    row = service.get_summary(db, "school")
+    assert row == summary
+    assert service.get_summary(db, "school", version=1)["covered_population"] == 100
+    assert stored_versions(db) == [1, 2]
+
+
+def test_prune_keeps_latest_versions(db, service, monkeypatch):
+    monkeypatch.setattr(coverage_service, "COVERAGE_SUMMARY_RETENTION", 3)
+    # Больше 10 версий: строковое сравнение поставило бы "10" и "11" раньше "9"
+    add_schools(db, [P0, P1, P2] * 4)
+
+    for version in range(1, 13):
+        service.get_summary(db, "school", version=version)
+
+    assert stored_versions(db) == [10, 11, 12]
+    assert service.get_summary(db, "school", version=2)["data_version"] == 2
+    assert stored_versions(db) == [10, 11, 12]
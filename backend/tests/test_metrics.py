@@ -0,0 +1,69 @@
+import multiprocessing
+
+import pytest
+
+from utils import metrics
+from utils.metrics import Histogram, flush_metrics, render_metrics, reset_multiproc_dir
+
+
+@pytest.fixture
+def histogram(tmp_path, monkeypatch):
+    """
+    Гистограмма в общем каталоге метрик, как у рабочих процессов gunicorn
+    """
+    histogram = Histogram("test_duration_seconds", "Тест", buckets=(0.1, 1.0))
+    monkeypatch.setattr(metrics, "REGISTRY", [histogram])
+    monkeypatch.setenv(metrics.MULTIPROC_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(metrics, "_flush_state", {"pid": None, "path": None, "flushed": 0.0})
+    return histogram
+
+
+def worker(values):
+    for value in values:
+        metrics.REGISTRY[0].observe(value, path="/a")
+    flush_metrics(force=True)
+
+
+def run_worker(values):
+    process = multiprocessing.get_context("fork").Process(target=worker, args=(values,))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+
+def test_metrics_are_summed_across_workers(histogram):
+    reset_multiproc_dir()
+    # Два завершившихся рабочих процесса и текущий, который отвечает на запрос /metrics
+    run_worker([0.05, 0.5])
+    run_worker([2.0])
+    histogram.observe(0.05, path="/a")
+    histogram.observe(0.5, path="/b")
+
+    lines = render_metrics().splitlines()
+
+    assert 'test_duration_seconds_bucket{path="/a",le="0.1"} 2' in lines
+    assert 'test_duration_seconds_bucket{path="/a",le="1.0"} 3' in lines
+    assert 'test_duration_seconds_count{path="/a"} 4' in lines
+    assert 'test_duration_seconds_sum{path="/a"} 2.6' in lines
+    assert 'test_duration_seconds_count{path="/b"} 1' in lines
+    # Повторный запрос не удваивает собственные замеры процесса
+    assert render_metrics().splitlines() == lines
+
+
+def test_reset_removes_previous_run(histogram):
+    run_worker([0.05])
+    reset_multiproc_dir()
+
+    assert "test_duration_seconds_count" not in render_metrics()
+
+
+def test_flush_is_throttled(histogram, tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "FLUSH_INTERVAL", 3600.0)
+    histogram.observe(0.05)
+    flush_metrics()
+    histogram.observe(0.05)
+    flush_metrics()
+
+    # Вторая запись отложена до истечения интервала: в файле только первый замер
+    (stored,) = metrics._collect(str(tmp_path))
+    assert "test_duration_seconds_count 1" in stored.render()
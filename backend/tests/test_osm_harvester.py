@@ -0,0 +1,171 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+
+from models.database import FacilityModel
+from services.osm_harvester import Checkpoint, OSMHarvester, TileTooLarge, parse_elements, save_facilities, tile_key
+
+GOOD = (42.0, 74.0, 42.5, 74.5)
+BAD = (43.0, 75.0, 43.5, 75.5)
+
+
+def element(osm_id: int, lat: float, lon: float, amenity: str = "school", name: str = "Школа") -> dict:
+    return {"type": "node", "id": osm_id, "lat": lat, "lon": lon, "tags": {"amenity": amenity, "name": name}}
+
+
+class FakeHarvester(OSMHarvester):
+    """
+    Вместо Overpass - заранее заданные ответы по тайлам; тайлы из failing падают с ошибкой
+    """
+
+    def __init__(self, responses=None, failing=(), **kwargs):
+        super().__init__(rate=1000, **kwargs)
+        self.responses = responses or {}
+        self.failing = set(failing)
+        self.fetched = []
+
+    async def fetch_tile(self, session, tile):
+        self.fetched.append(tile)
+        if tile in self.failing:
+            raise RuntimeError(f"Overpass request failed: {tile_key(tile)}")
+        return self.responses.get(tile, [])
+
+
+def test_failed_tile_stays_in_checkpoint(db, tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    # По одному тайлу: очередь берется с конца, поэтому GOOD успевает обработаться до падения BAD
+    harvester = FakeHarvester(
+        {GOOD: [element(1, 42.2, 74.2)]}, failing=[BAD], checkpoint_path=path, concurrency=1
+    )
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(harvester.run([BAD, GOOD]))
+
+    checkpoint = Checkpoint(path)
+    assert checkpoint.pending == [BAD]
+    assert checkpoint.done == {tile_key(GOOD)}
+    assert checkpoint.seen == {"node/1"}
+
+    # Повторный запуск продолжает с упавшего тайла и в конце удаляет checkpoint
+    resumed = FakeHarvester({BAD: [element(2, 43.2, 75.2)]}, checkpoint_path=path)
+    stats = asyncio.run(resumed.run([BAD, GOOD]))
+    assert resumed.fetched == [BAD]
+    assert stats["saved"] == 1
+    assert not (tmp_path / "checkpoint.json").exists()
+    assert db.query(FacilityModel).count() == 2
+
+
+def test_too_large_tile_is_split(db):
+    class SplittingHarvester(FakeHarvester):
+        async def fetch_tile(self, session, tile):
+            if tile == GOOD:
+                raise TileTooLarge("timed out")
+            return await super().fetch_tile(session, tile)
+
+    harvester = SplittingHarvester(min_tile_size=0.1)
+    stats = asyncio.run(harvester.run([GOOD]))
+
+    assert stats["splits"] == 1
+    assert stats["tiles"] == 4
+    assert sorted(harvester.fetched) == sorted([
+        (42.0, 74.0, 42.25, 74.25), (42.0, 74.25, 42.25, 74.5),
+        (42.25, 74.0, 42.5, 74.25), (42.25, 74.25, 42.5, 74.5),
+    ])
+
+
+def test_save_facilities_upserts_by_osm_id(db):
+    legacy = FacilityModel(
+        name="Гимназия", address="ул. Токтогула 1", latitude=42.87, longitude=74.6,
+        facility_type="school", city="Бишкек", country="Кыргызстан"
+    )
+    db.add(legacy)
+    db.commit()
+
+    # Запись без OSM id с теми же типом и координатами получает OSM id, заполненный адрес сохраняется
+    assert save_facilities(parse_elements([element(10, 42.87, 74.6, name="Гимназия №1")])) == 1
+    db.expire_all()
+    row = db.query(FacilityModel).one()
+    assert (row.id, row.osm_id, row.name, row.address) == (legacy.id, "node/10", "Гимназия №1", "ул. Токтогула 1")
+
+    # Перенесенный в OSM объект обновляет свою запись, а не добавляется повторно
+    assert save_facilities(parse_elements([element(10, 42.88, 74.61, name="Гимназия №1")])) == 1
+    assert save_facilities(parse_elements([element(10, 42.88, 74.61, name="Гимназия №1")])) == 0
+    db.expire_all()
+    row = db.query(FacilityModel).one()
+    assert (row.id, row.latitude, row.longitude) == (legacy.id, 42.88, 74.61)
+
+
+def test_unsplittable_tile_does_not_stop_the_crawl(db, tmp_path):
+    class DenseHarvester(FakeHarvester):
+        async def fetch_tile(self, session, tile):
+            if tile == BAD:
+                self.fetched.append(tile)
+                raise TileTooLarge("timed out")
+            return await super().fetch_tile(session, tile)
+
+    path = str(tmp_path / "checkpoint.json")
+    # BAD нельзя разбить (min_tile_size больше половины тайла), GOOD - последний и падает сетевой ошибкой
+    harvester = DenseHarvester(failing=[GOOD], min_tile_size=1.0, checkpoint_path=path, concurrency=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(harvester.run([GOOD, BAD]))
+
+    checkpoint = Checkpoint(path)
+    assert checkpoint.failed == {tile_key(BAD)}
+    assert checkpoint.pending == [GOOD]
+
+    # Продолжение не повторяет BAD и доходит до конца
+    resumed = DenseHarvester({GOOD: [element(1, 42.2, 74.2)]}, min_tile_size=1.0, checkpoint_path=path)
+    stats = asyncio.run(resumed.run([GOOD, BAD]))
+    assert resumed.fetched == [GOOD]
+    assert stats["saved"] == 1
+
+    # Новый полный обход снова пробует BAD, но не останавливается на нем
+    fresh = DenseHarvester({GOOD: [element(1, 42.2, 74.2)]}, min_tile_size=1.0, checkpoint_path=path)
+    stats = asyncio.run(fresh.run([GOOD, BAD]))
+    assert sorted(fresh.fetched) == [GOOD, BAD]
+    assert stats["failed"] == 1
+    assert stats["tiles"] == 1
+
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.headers = {}
+
+    def raise_for_status(self):
+        raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+
+class FakeSession:
+    def __init__(self, status: int):
+        self.status = status
+        self.requests = 0
+
+    @asynccontextmanager
+    async def post(self, url, data=None):
+        self.requests += 1
+        yield FakeResponse(self.status)
+
+
+@pytest.mark.parametrize("status, error", [
+    (400, aiohttp.ClientResponseError),
+    (413, TileTooLarge),
+])
+def test_fetch_tile_status(status, error):
+    harvester = OSMHarvester(rate=1000)
+    session = FakeSession(status)
+
+    with pytest.raises(error):
+        asyncio.run(harvester.fetch_tile(session, GOOD))
+    assert session.requests == 1
+
+
+def test_bad_request_is_not_split(db):
+    harvester = OSMHarvester(rate=1000)
+    session = FakeSession(400)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(harvester.process_tile(session, GOOD))
+    assert harvester.stats["splits"] == 0
@@ -0,0 +1,84 @@
+import h3
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.database import FacilityModel
+from routers.placement import router
+from tests.test_scoring_service import A, B, CELLS, FAR
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="")
+    return TestClient(app)
+
+
+def add_school(db, point):
+    db.add(FacilityModel(
+        name="Школа", address="", latitude=point[0], longitude=point[1],
+        facility_type="school", city="Бишкек", country="Кыргызстан"
+    ))
+    db.commit()
+
+
+def test_score_candidates(client, db, register_region):
+    region = register_region(CELLS)
+    add_school(db, B)
+
+    response = client.post("/placement/score", json={
+        "region": region, "facility_type": "school",
+        "candidates": [[A[1], A[0]], [B[1], B[0]]],
+    })
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["data_version"] == 1
+    assert data["improvement_score"] == pytest.approx(100.0)
+    first, second = (f["properties"] for f in data["features"])
+    assert (first["marginal_population"], first["reach_population"], first["overlap"]) == (7000, 7000, 0.0)
+    assert (first["score"], first["uncovered_share"]) == (1.0, 1.0)
+    assert first["nearest_facility_km"] == pytest.approx(h3.great_circle_distance(A, B, unit="km"), abs=1e-3)
+    assert (second["marginal_population"], second["overlap"], second["score"]) == (0, 1.0, 0.0)
+    assert second["nearest_facility_km"] == pytest.approx(0.0, abs=1e-3)
+
+
+def test_score_uses_snapshot_version(client, db, register_region):
+    region = register_region(CELLS)
+    add_school(db, B)
+    add_school(db, A)
+
+    request = {"region": region, "facility_type": "school", "candidates": [[A[1], A[0]]]}
+    current = client.post("/placement/score", json=request).json()
+    before = client.post("/placement/score", json={**request, "version": 1}).json()
+
+    assert current["features"][0]["properties"]["marginal_population"] == 0
+    assert current["improvement_score"] == 0.0
+    assert before["features"][0]["properties"]["marginal_population"] == 7000
+    assert before["data_version"] == 1
+
+
+def test_facilities_outside_region_are_ignored(client, db, register_region):
+    region = register_region(CELLS)
+    # Школа далеко за границей региона не влияет на расстояние до ближайшего объекта
+    add_school(db, (FAR[0] + 1.0, FAR[1]))
+
+    response = client.post("/placement/score", json={
+        "region": region, "facility_type": "school", "candidates": [[A[1], A[0]]],
+    })
+
+    assert response.json()["features"][0]["properties"]["nearest_facility_km"] is None
+
+
+@pytest.mark.parametrize("request_data, status", [
+    ({"region": "atlantis", "facility_type": "school", "candidates": [[74.6, 42.87]]}, 404),
+    ({"facility_type": "library", "candidates": [[74.6, 42.87]]}, 400),
+    ({"facility_type": "school", "candidates": [[74.6]]}, 400),
+    ({"facility_type": "school", "candidates": [[74.6, 42.87]], "version": 99}, 400),
+])
+def test_score_errors(client, db, register_region, request_data, status):
+    region = register_region(CELLS)
+    response = client.post("/placement/score", json={"region": region, **request_data})
+
+    assert response.status_code == status
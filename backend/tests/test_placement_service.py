@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from services.placement_service import greedy_max_coverage
+from tests.conftest import make_layer
+
+# Три гексагона в ~10 км друг от друга: радиус 1 км покрывает только свой гексагон
+POINTS = [(42.80, 74.50), (42.87, 74.60), (42.95, 74.70)]
+NO_FACILITIES = np.zeros((0, 2))
+
+
+@pytest.fixture
+def layer():
+    return make_layer(POINTS, [100, 500, 300])
+
+
+def test_picks_cells_by_population(layer):
+    result = greedy_max_coverage(layer, NO_FACILITIES, radius_km=1, count=2)
+
+    assert [loc["index"] for loc in result["locations"]] == [1, 2]
+    assert [loc["covered_population"] for loc in result["locations"]] == [500, 300]
+    assert result["locations"][0]["h3"] == layer.cell_id(1)
+    assert result["total_population"] == 900
+    assert result["covered_before"] == 0
+    assert result["covered_after"] == 800
+    assert result["improvement_score"] == pytest.approx(800 / 900 * 100)
+
+
+def test_existing_facilities_are_covered(layer):
+    existing = np.array([POINTS[1]])
+    result = greedy_max_coverage(layer, existing, radius_km=1, count=2)
+
+    assert [loc["index"] for loc in result["locations"]] == [2, 0]
+    assert result["covered_before"] == 500
+    assert result["covered_after"] == 900
+    assert result["improvement_score"] == pytest.approx(100.0)
+
+
+def test_stops_when_nothing_left_to_cover(layer):
+    result = greedy_max_coverage(layer, NO_FACILITIES, radius_km=1, count=10)
+
+    assert len(result["locations"]) == 3
+    assert result["covered_after"] == result["total_population"]
+
+
+def test_unserved_replaces_coverage_by_radius(layer):
+    # Население сверх вместимости: в гексагоне 1 всех обслужили, в 0 и 2 - частично
+    unserved = np.array([100.0, 0.0, 300.0])
+    result = greedy_max_coverage(layer, NO_FACILITIES, radius_km=1, count=3, unserved=unserved)
+
+    assert [loc["index"] for loc in result["locations"]] == [2, 0]
+    assert [loc["covered_population"] for loc in result["locations"]] == [300, 100]
+    assert result["covered_before"] == 900 - 400
+    assert result["covered_after"] == 900
+    # Переданный массив не изменяется
+    assert unserved.tolist() == [100.0, 0.0, 300.0]
+
+
+def test_candidates(layer):
+    candidates = np.array([POINTS[0], POINTS[2]])
+    result = greedy_max_coverage(layer, NO_FACILITIES, radius_km=1, count=1, candidates=candidates)
+
+    location = result["locations"][0]
+    assert location["index"] == 1
+    assert location["h3"] is None
+    assert (location["latitude"], location["longitude"]) == POINTS[2]
+    assert location["covered_population"] == 300
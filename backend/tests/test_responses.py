@@ -0,0 +1,136 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+
+from utils import responses
+from utils.responses import CompressionMiddleware, ORJSONResponse, choose_encoding
+
+PAYLOAD = {"features": [{"name": "Школа", "coordinates": [74.6, 42.87]}] * 50}
+
+
+class FakeBrotli:
+    """
+    Заменяет модуль brotli: "сжатие" обратимо и отличимо от gzip
+    """
+
+    @staticmethod
+    def compress(body: bytes, quality: int = 11) -> bytes:
+        return b"br:" + body[::-1]
+
+    @staticmethod
+    def decompress(body: bytes) -> bytes:
+        return body[3:][::-1]
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", FakeBrotli)
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/json")
+    def json_endpoint():
+        return ORJSONResponse(PAYLOAD)
+
+    @app.get("/small")
+    def small():
+        return ORJSONResponse({"ok": True})
+
+    @app.get("/binary")
+    def binary():
+        return Response(b"\x00" * 1000, media_type="application/octet-stream")
+
+    @app.get("/encoded")
+    def encoded():
+        return PlainTextResponse("x" * 1000, headers={"Content-Encoding": "identity"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"x" * 500, b"y" * 500]), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def get(client: TestClient, path: str, accept_encoding: str):
+    # httpx сам распаковывает gzip - читаем сырое тело
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("br, gzip", "br"),
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("GZIP", "gzip"),
+    ("gzip;q=0", None),
+    ("deflate, identity", None),
+    ("", None),
+])
+def test_choose_encoding(with_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(without_brotli):
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("br") is None
+
+
+def test_brotli(with_brotli, client):
+    response, body = get(client, "/json", "gzip, br")
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert FakeBrotli.decompress(body) == ORJSONResponse(PAYLOAD).body
+
+
+def test_real_brotli(client):
+    brotli = pytest.importorskip("brotli")
+    response, body = get(client, "/json", "br")
+
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(body) == ORJSONResponse(PAYLOAD).body
+
+
+def test_gzip_without_brotli(without_brotli, client):
+    response, body = get(client, "/json", "gzip, br")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == ORJSONResponse(PAYLOAD).body
+
+
+def test_gzip_when_br_refused(with_brotli, client):
+    response, body = get(client, "/json", "br;q=0, gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == ORJSONResponse(PAYLOAD).body
+
+
+@pytest.mark.parametrize("path, accept_encoding", [
+    ("/json", "identity"),
+    ("/small", "gzip, br"),
+    ("/binary", "gzip, br"),
+    ("/encoded", "gzip, br"),
+    ("/stream", "gzip, br"),
+])
+def test_not_compressed(with_brotli, client, path, accept_encoding):
+    response, body = get(client, path, accept_encoding)
+
+    assert response.headers.get("content-encoding") in (None, "identity")
+    assert "vary" not in response.headers
+    assert not body.startswith((b"\x1f\x8b", b"br:"))
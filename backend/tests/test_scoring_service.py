@@ -0,0 +1,72 @@
+import h3
+import numpy as np
+import pytest
+
+from services.scoring_service import score_candidates, score_properties
+from tests.conftest import make_layer
+
+# Кластер A: гексагон и шесть соседей по 1000 жителей; B - отдельный гексагон в ~10 км с 3000 жителей.
+# Радиус 2 км покрывает весь кластер из его центра и не достает от A до B
+CENTRE_A = h3.latlng_to_cell(42.87, 74.60, 8)
+CELL_B = h3.latlng_to_cell(42.96, 74.60, 8)
+CELLS = {**{cell: 1000 for cell in h3.grid_disk(CENTRE_A, 1)}, CELL_B: 3000}
+A = h3.cell_to_latlng(CENTRE_A)
+B = h3.cell_to_latlng(CELL_B)
+FAR = (43.30, 74.60)
+
+
+@pytest.fixture
+def layer():
+    points = [h3.cell_to_latlng(cell) for cell in CELLS]
+    return make_layer(points, list(CELLS.values()))
+
+
+def test_scores_against_existing_coverage(layer):
+    scores = score_candidates(layer, np.array([A, B, FAR]), np.array([B]), radius_km=2)
+
+    assert scores["reach_population"].tolist() == [7000, 3000, 0]
+    assert scores["marginal_population"].tolist() == [7000, 0, 0]
+    assert scores["overlap"].tolist() == [0.0, 1.0, 0.0]
+    assert scores["score"].tolist() == [1.0, 0.0, 0.0]
+    assert scores["uncovered_share"].tolist() == [1.0, 0.0, 0.0]
+    assert scores["nearest_facility_km"].tolist() == pytest.approx([
+        h3.great_circle_distance(A, B, unit="km"), 0.0, h3.great_circle_distance(FAR, B, unit="km")
+    ], rel=1e-5)
+    assert scores["joint_marginal_population"] == 7000
+    assert scores["improvement_score"] == pytest.approx(100.0)
+
+
+def test_scores_without_facilities(layer):
+    scores = score_candidates(layer, np.array([A, B]), np.zeros((0, 2)), radius_km=2)
+
+    assert scores["marginal_population"].tolist() == [7000, 3000]
+    # Лучший кандидат набора - 1.0, остальные относительно него
+    assert scores["score"].tolist() == pytest.approx([1.0, 3000 / 7000])
+    assert scores["uncovered_share"].tolist() == pytest.approx([0.7, 0.3])
+    assert np.isinf(scores["nearest_facility_km"]).all()
+    assert scores["improvement_score"] == pytest.approx(100.0)
+
+    properties = score_properties(scores, 1)
+    assert properties["nearest_facility_km"] is None
+    assert properties["marginal_population"] == 3000
+    assert properties["overlap"] == 0.0
+
+
+def test_joint_effect_counts_shared_cells_once(layer):
+    # Два кандидата в одном месте покрывают одних и тех же жителей
+    scores = score_candidates(layer, np.array([A, A]), np.zeros((0, 2)), radius_km=2)
+
+    assert scores["marginal_population"].tolist() == [7000, 7000]
+    assert scores["joint_marginal_population"] == 7000
+    assert scores["improvement_score"] == pytest.approx(70.0)
+
+
+def test_precomputed_coverage_mask(layer):
+    covered = np.zeros(len(layer), dtype=bool)
+    covered[list(CELLS).index(CENTRE_A)] = True
+    scores = score_candidates(layer, np.array([A]), np.zeros((0, 2)), radius_km=2, covered=covered)
+
+    assert scores["reach_population"].tolist() == [7000]
+    assert scores["marginal_population"].tolist() == [6000]
+    assert scores["overlap"].tolist() == pytest.approx([1 / 7])
+    assert scores["uncovered_share"].tolist() == pytest.approx([6000 / 9000])
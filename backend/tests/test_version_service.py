@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from models.database import FacilityModel
+from services.coverage_service import CoverageService
+from services.version_service import current_version, load_snapshot, resolve_version, snapshot_coordinates
+from tests.conftest import make_layer
+
+# Гексагоны в ~10 км друг от друга: радиус школы (2 км) покрывает только свой гексагон
+P0, P1, P2 = (42.80, 74.50), (42.87, 74.60), (42.95, 74.70)
+
+
+def facility(facility_type: str, point) -> FacilityModel:
+    return FacilityModel(
+        name="test", address="", latitude=point[0], longitude=point[1],
+        facility_type=facility_type, city="Бишкек", country="Кыргызстан"
+    )
+
+
+@pytest.fixture
+def history(db):
+    """
+    Пять версий данных:
+    1 - школа s1 в P0; 2 - школа s2 в P1; 3 - s1 перенесена в P2; 4 - s2 удалена; 5 - s1 стала больницей
+    """
+    s1 = facility("school", P0)
+    db.add(s1)
+    db.commit()
+    s2 = facility("school", P1)
+    db.add(s2)
+    db.commit()
+    s1.latitude, s1.longitude = P2
+    db.commit()
+    db.delete(s2)
+    db.commit()
+    s1.facility_type = "hospital"
+    db.commit()
+    return s1.id, s2.id
+
+
+def test_versions_are_counted(db, history):
+    assert current_version(db) == 5
+    assert resolve_version(db) == 5
+    assert resolve_version(db, 2) == 2
+    with pytest.raises(ValueError):
+        resolve_version(db, 6)
+    with pytest.raises(ValueError):
+        resolve_version(db, -1)
+
+
+def test_load_snapshot_rewinds_changes(db, history):
+    s1, s2 = history
+
+    def schools(version):
+        return {
+            facility_id: (f["latitude"], f["longitude"])
+            for facility_id, f in load_snapshot(db, version, ["school"]).items()
+        }
+
+    assert schools(0) == {}
+    assert schools(1) == {s1: P0}
+    assert schools(2) == {s1: P0, s2: P1}
+    assert schools(3) == {s1: P2, s2: P1}
+    assert schools(4) == {s1: P2}
+    assert schools(5) == {}
+
+
+def test_load_snapshot_follows_type_changes(db, history):
+    s1, _ = history
+
+    assert load_snapshot(db, 4, ["hospital"]) == {}
+    assert load_snapshot(db, 5, ["hospital"]) == {
+        s1: {"facility_type": "hospital", "latitude": P2[0], "longitude": P2[1]}
+    }
+    assert load_snapshot(db, 4, ["school", "hospital"])[s1]["facility_type"] == "school"
+
+    coords = snapshot_coordinates(db, 3, ["school", "hospital"])
+    assert sorted(map(tuple, coords["school"])) == sorted([P1, P2])
+    assert coords["hospital"].shape == (0, 2)
+
+
+def test_index_at_rewinds_shared_index(db, history):
+    layer = make_layer([P0, P1, P2], [100, 200, 300])
+    service = CoverageService(layer, region="test")
+    expected = {
+        0: [False, False, False],
+        1: [True, False, False],
+        2: [True, True, False],
+        3: [False, True, True],
+        4: [False, False, True],
+        5: [False, False, False],
+    }
+
+    # Общий индекс сначала продвигается до текущей версии, затем запрашиваются прошлые
+    assert service._index_at(db, "school", 5).covered.tolist() == expected[5]
+    for version in range(5):
+        index = service._index_at(db, "school", version)
+        assert index.version == version
+        assert index.covered.tolist() == expected[version]
+        # Откат совпадает с индексом, построенным по снимку на эту версию с нуля
+        fresh = CoverageService(layer, region="test")._index_at(db, "school", version)
+        assert np.array_equal(index.counts, fresh.counts)
+
+    shared = service._indexes["school"]
+    assert shared.version == 5
+    assert shared.covered.tolist() == expected[5]
+
+
+def test_covered_mask_by_version(db, history):
+    layer = make_layer([P0, P1, P2], [100, 200, 300])
+    service = CoverageService(layer, region="test")
+
+    assert service.covered_mask(db, "school").tolist() == [False, False, False]
+    assert service.covered_mask(db, "school", version=2).tolist() == [True, True, False]
+    assert service.covered_mask(db, "hospital").tolist() == [False, False, True]
+    with pytest.raises(ValueError):
+        service.covered_mask(db, "library")
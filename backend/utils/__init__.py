@@ -0,0 +1 @@
+# Инициализационный файл для пакета utils
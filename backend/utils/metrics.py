@@ -0,0 +1,231 @@
+"""
+Метрики времени выполнения в формате Prometheus
+
+Под gunicorn у каждого рабочего процесса свои гистограммы. Если задан METRICS_MULTIPROC_DIR,
+процессы периодически записывают их в этот каталог (файл на процесс), а /metrics
+суммирует файлы всех рабочих процессов, в том числе завершившихся.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Границы корзин гистограмм в секундах
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Потокобезопасная гистограмма с метками (аналог prometheus_client.Histogram)
+    """
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Состояние гистограммы для записи в JSON
+        """
+        with self._lock:
+            series = [
+                [[list(pair) for pair in key], list(counts), self._sums[key]]
+                for key, counts in self._counts.items()
+            ]
+        return {"buckets": list(self.buckets), "series": series}
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Добавляет к гистограмме состояние, сохраненное snapshot в другом процессе.
+        Состояние с другими границами корзин пропускается
+        """
+        if tuple(snapshot["buckets"]) != self.buckets:
+            return
+        with self._lock:
+            for key, counts, total in snapshot["series"]:
+                key = tuple((k, v) for k, v in key)
+                merged = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+                for i, count in enumerate(counts):
+                    merged[i] += count
+                self._sums[key] = self._sums.get(key, 0.0) + total
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in key
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+# Время обработки HTTP-запросов
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса"
+)
+
+# Время выполнения отдельных участков кода (запросы к БД, геометрия, вызовы OpenAI)
+SPAN_DURATION = Histogram(
+    "span_duration_seconds", "Время выполнения участков кода"
+)
+
+REGISTRY = [REQUEST_DURATION, SPAN_DURATION]
+
+# Каталог для метрик рабочих процессов gunicorn и как часто процесс обновляет в нем свой файл
+MULTIPROC_DIR_ENV = "METRICS_MULTIPROC_DIR"
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))
+
+# Замеры timed, которые нужно дополнительно вернуть вызывающему (из процесса пула в рабочий процесс)
+_recording = threading.local()
+
+
+@contextmanager
+def timed(span: str) -> Iterator[None]:
+    """
+    Замеряет время выполнения блока кода и записывает в гистограмму span_duration_seconds
+
+    Пример:
+        with timed("db.facilities.query"):
+            facilities = query.all()
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_DURATION.observe(elapsed, span=span)
+        recorded = getattr(_recording, "spans", None)
+        if recorded is not None:
+            recorded.append((span, elapsed))
+
+
+@contextmanager
+def recorded_spans() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Собирает замеры timed внутри блока в список (span, секунды).
+    Метрики процессов пула не попадают в /metrics рабочего процесса, поэтому
+    замеры передаются вместе с результатом и учитываются через observe_spans.
+    """
+    spans: List[Tuple[str, float]] = []
+    previous = getattr(_recording, "spans", None)
+    _recording.spans = spans
+    try:
+        yield spans
+    finally:
+        _recording.spans = previous
+
+
+def observe_spans(spans: List[Tuple[str, float]]) -> None:
+    for span, elapsed in spans:
+        SPAN_DURATION.observe(elapsed, span=span)
+
+
+# Файл метрик текущего процесса: после fork у процесса новый pid и новый файл
+_flush_lock = threading.Lock()
+_flush_state: Dict[str, Any] = {"pid": None, "path": None, "flushed": 0.0}
+
+
+def _multiproc_dir() -> Optional[str]:
+    return os.getenv(MULTIPROC_DIR_ENV) or None
+
+
+def reset_multiproc_dir() -> None:
+    """
+    Создает каталог метрик и удаляет файлы предыдущего запуска (вызывается мастером gunicorn)
+    """
+    directory = _multiproc_dir()
+    if directory is None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+
+
+def flush_metrics(force: bool = False) -> None:
+    """
+    Записывает гистограммы процесса в каталог METRICS_MULTIPROC_DIR не чаще FLUSH_INTERVAL.
+    Файл заменяется атомарно, поэтому /metrics другого процесса не прочитает его наполовину
+
+    :param force: записать сразу, не дожидаясь FLUSH_INTERVAL
+    """
+    directory = _multiproc_dir()
+    if directory is None:
+        return
+    with _flush_lock:
+        now = time.monotonic()
+        pid = os.getpid()
+        if _flush_state["pid"] != pid:
+            # Время запуска в имени: файл процесса с повторно выданным pid не затирает чужие данные
+            _flush_state.update(pid=pid, path=os.path.join(directory, f"{pid}-{time.time_ns()}.json"), flushed=0.0)
+        elif not force and now - _flush_state["flushed"] < FLUSH_INTERVAL:
+            return
+        path = _flush_state["path"]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({histogram.name: histogram.snapshot() for histogram in REGISTRY}, f)
+        os.replace(tmp_path, path)
+        _flush_state["flushed"] = now
+
+
+def _collect(directory: str) -> List[Histogram]:
+    """
+    Суммирует гистограммы из файлов всех процессов каталога
+    """
+    merged = {h.name: Histogram(h.name, h.description, h.buckets) for h in REGISTRY}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshots = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, snapshot in snapshots.items():
+            if name in merged:
+                merged[name].merge(snapshot)
+    return list(merged.values())
+
+
+def render_metrics() -> str:
+    """
+    Текст всех метрик в формате Prometheus exposition.
+    При заданном METRICS_MULTIPROC_DIR - сумма по всем рабочим процессам
+    """
+    directory = _multiproc_dir()
+    registry = REGISTRY
+    if directory is not None:
+        flush_metrics(force=True)
+        registry = _collect(directory)
+    lines: List[str] = []
+    for histogram in registry:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
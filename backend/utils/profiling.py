@@ -0,0 +1,51 @@
+"""
+Профилирование отдельного запроса (?profile=1)
+"""
+import cProfile
+import io
+import os
+import pstats
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+
+# Профилирование включается явно (PROFILING_ENABLED=true): отчет раскрывает внутренние
+# пути модулей и тайминги, а CORS открыт для любых клиентов
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def is_profiling_requested(request: Request) -> bool:
+    return PROFILING_ENABLED and request.query_params.get("profile") in ("1", "true")
+
+
+async def profile_request(request: Request, call_next) -> Response:
+    """
+    Выполняет запрос под профилировщиком и вместо ответа возвращает отчет.
+    Используется pyinstrument (HTML), если он установлен, иначе cProfile (текст).
+    cProfile видит только поток event loop, поэтому для sync-обработчиков,
+    работающих в пуле потоков, отчет будет неполным.
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await call_next(request)
+        finally:
+            profiler.stop()
+        return HTMLResponse(profiler.output_html())
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        await call_next(request)
+    finally:
+        profile.disable()
+
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(50)
+    return PlainTextResponse(output.getvalue())
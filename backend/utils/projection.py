@@ -0,0 +1,134 @@
+"""
+Проекции и метрические расчеты для расстояний и буферов
+"""
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import shapely
+from pyproj import CRS, Geod, Transformer
+
+WGS84 = "EPSG:4326"
+
+# Эллипсоид WGS84 для геодезических расчетов
+GEOD = Geod(ellps="WGS84")
+
+# Средний радиус Земли в метрах (для быстрых haversine-расстояний)
+EARTH_RADIUS_M = 6371008.8
+
+ArrayLike = Union[float, np.ndarray]
+
+
+@lru_cache(maxsize=128)
+def get_transformer(src: str, dst: str) -> Transformer:
+    """
+    Возвращает закэшированный Transformer (создание объекта дорогое)
+
+    :param src: Исходная СК (например, 'EPSG:4326')
+    :param dst: Целевая СК
+    :return: Transformer с порядком осей (lon, lat) / (x, y)
+    """
+    return Transformer.from_crs(CRS.from_user_input(src), CRS.from_user_input(dst), always_xy=True)
+
+
+def utm_crs(lon: float, lat: float) -> str:
+    """
+    Зона UTM, в которую попадает точка
+    """
+    zone = int((lon + 180) // 6) % 60 + 1
+    return f"EPSG:{32600 + zone if lat >= 0 else 32700 + zone}"
+
+
+def local_metric_crs(lon: float, lat: float, kind: str = "aeqd") -> str:
+    """
+    Локальная метрическая СК для региона с центром в (lon, lat)
+
+    :param lon: Долгота центра региона
+    :param lat: Широта центра региона
+    :param kind: 'aeqd' - азимутальная равнопромежуточная, 'utm' - зона UTM
+    :return: Строка описания СК
+    """
+    if kind == "utm":
+        return utm_crs(lon, lat)
+    if kind != "aeqd":
+        raise ValueError(f"Unsupported projection kind: {kind}")
+    # Округляем центр, чтобы близкие регионы переиспользовали один Transformer из кэша
+    return f"+proj=aeqd +lat_0={round(lat, 2)} +lon_0={round(lon, 2)} +datum=WGS84 +units=m +no_defs"
+
+
+def to_metric(lon: np.ndarray, lat: np.ndarray, crs: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, str]:
+    """
+    Переводит массивы координат WGS84 в метрическую СК без создания GeoDataFrame
+
+    :param lon: Массив долгот
+    :param lat: Массив широт
+    :param crs: Целевая СК; по умолчанию - AEQD с центром в середине охвата точек
+    :return: (x, y, crs)
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    if crs is None:
+        crs = local_metric_crs(
+            float((lon.min() + lon.max()) / 2) if lon.size else 0.0,
+            float((lat.min() + lat.max()) / 2) if lat.size else 0.0,
+        )
+    x, y = get_transformer(WGS84, crs).transform(lon, lat)
+    return x, y, crs
+
+
+def from_metric(x: np.ndarray, y: np.ndarray, crs: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Обратное преобразование из метрической СК в WGS84
+
+    :return: (lon, lat)
+    """
+    return get_transformer(crs, WGS84).transform(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+
+
+def haversine_distance(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> np.ndarray:
+    """
+    Векторизованное расстояние по большому кругу в метрах (с поддержкой broadcasting)
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def geodesic_distance(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> np.ndarray:
+    """
+    Точное расстояние по эллипсоиду WGS84 в метрах (массивы одинаковой длины)
+    """
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (lon1, lat1, lon2, lat2))
+    )
+    _, _, distance = GEOD.inv(lon1.ravel(), lat1.ravel(), lon2.ravel(), lat2.ravel())
+    return np.asarray(distance).reshape(lon1.shape)
+
+
+def geodesic_buffers(lon: np.ndarray, lat: np.ndarray, radius: ArrayLike, segments: int = 64) -> np.ndarray:
+    """
+    Строит геодезические круги заданного радиуса вокруг точек за один векторный вызов
+
+    :param lon: Массив долгот центров
+    :param lat: Массив широт центров
+    :param radius: Радиус в метрах (скаляр или массив)
+    :param segments: Количество вершин окружности
+    :return: Массив shapely-полигонов в WGS84
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    n = lon.size
+    if n == 0:
+        return np.empty(0, dtype=object)
+
+    azimuths = np.linspace(0.0, 360.0, segments, endpoint=False)
+    lon_grid = np.repeat(lon, segments)
+    lat_grid = np.repeat(lat, segments)
+    az_grid = np.tile(azimuths, n)
+    dist_grid = np.repeat(np.broadcast_to(np.asarray(radius, dtype=np.float64), (n,)), segments)
+
+    vx, vy, _ = GEOD.fwd(lon_grid, lat_grid, az_grid, dist_grid)
+    rings = np.stack([np.asarray(vx), np.asarray(vy)], axis=-1).reshape(n, segments, 2)
+    # Замыкаем кольца
+    rings = np.concatenate([rings, rings[:, :1, :]], axis=1)
+    return shapely.polygons(rings)
@@ -0,0 +1,167 @@
+"""
+Быстрая сериализация JSON/GeoJSON (orjson) и сжатие ответов (brotli/gzip)
+"""
+import gzip
+import os
+from typing import Any, Optional
+
+import numpy as np
+import orjson
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli не обязателен - без него используется gzip
+    brotli = None
+
+# Количество знаков после запятой для координат (6 знаков ~ 10 см)
+COORDINATE_PRECISION = int(os.getenv("GEOJSON_PRECISION", "6"))
+
+# Ключи, значения которых - координаты
+COORDINATE_KEYS = ("coordinates", "latitude", "longitude")
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _round_coordinates(value: Any, precision: int) -> Any:
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), precision)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        try:
+            # Точки, линии и полигоны с одним кольцом - одним вызовом numpy
+            return np.round(np.asarray(value, dtype=np.float64), precision).tolist()
+        except ValueError:
+            # Неровные вложенные массивы (полигоны с дырами, мультиполигоны)
+            return [_round_coordinates(v, precision) for v in value]
+    return value
+
+
+def prepare_content(value: Any, precision: Optional[int]) -> Any:
+    """
+    Готовит данные к сериализации: модели pydantic -> dict, округление координат
+    """
+    if isinstance(value, BaseModel):
+        value = value.model_dump() if hasattr(value, "model_dump") else value.dict()
+    if isinstance(value, dict):
+        return {
+            k: _round_coordinates(v, precision) if precision is not None and k in COORDINATE_KEYS
+            else prepare_content(v, precision)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [prepare_content(v, precision) for v in value]
+    return value
+
+
+class ORJSONResponse(Response):
+    """
+    JSON-ответ через orjson. Данные не проходят повторную валидацию pydantic,
+    поэтому использовать только для доверенных внутренних данных.
+    """
+    media_type = "application/json"
+
+    def __init__(self, content: Any, precision: Optional[int] = None, **kwargs):
+        # Устанавливается до super().__init__, который вызывает render
+        self.precision = precision
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(prepare_content(content, self.precision), option=ORJSON_OPTIONS)
+
+
+class GeoJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse с округлением координат до COORDINATE_PRECISION знаков
+    """
+
+    def __init__(self, content: Any, precision: Optional[int] = COORDINATE_PRECISION, **kwargs):
+        super().__init__(content, precision=precision, **kwargs)
+
+
+COMPRESSIBLE_TYPES = ("application/json", "application/geo+json", "text/", "application/javascript")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Выбирает кодировку по заголовку Accept-Encoding: br (если доступен brotli), затем gzip
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы brotli или gzip в зависимости от Accept-Encoding клиента.
+    Потоковые ответы (из нескольких частей) передаются без сжатия.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            assert start_message is not None
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,140 @@
+"""
+Общий пул процессов для тяжелых расчетов (размещение, распределение нагрузки).
+
+Пул создается в каждом рабочем процессе веб-сервера отдельно и запускается через fork
+при старте приложения (lifespan), поэтому его процессы наследуют уже загруженные регионы
+(слои населения, индексы) без копирования и без повторной загрузки. Регионы, загруженные
+после запуска пула, процессы пула не загружают (см. services.region_service.RegionNotInherited).
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from utils.metrics import observe_spans, recorded_spans
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Число процессов пула; по умолчанию ядра делятся поровну между рабочими процессами gunicorn
+ANALYSIS_PROCESSES = int(os.getenv(
+    "ANALYSIS_PROCESSES",
+    str(max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("WEB_CONCURRENCY", "1")))))
+))
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Процесс - участник пула (задается инициализатором пула)
+_in_pool = False
+
+
+def _forget_pool() -> None:
+    # Пул родителя в дочернем процессе непригоден: его служебные потоки после fork не существуют
+    global _pool
+    _pool = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pool)
+
+
+def _mark_pool_process() -> None:
+    global _in_pool
+    _in_pool = True
+
+
+def in_pool_process() -> bool:
+    return _in_pool
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Пул процессов текущего процесса. Обычно создается при старте приложения (warm_process_pool);
+    здесь создается лениво только вне веб-сервера (бенчмарки, скрипты).
+    На Linux используется fork, чтобы процессы пула унаследовали загруженные данные.
+    """
+    global _pool
+    if _pool is None:
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        _pool = ProcessPoolExecutor(
+            max_workers=ANALYSIS_PROCESSES,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_mark_pool_process,
+        )
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Убирает сломанный пул (процесс пула упал); следующий вызов создаст новый.
+    Пул, уже пересозданный параллельным запросом, не трогаем.
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+        logger.warning("Analysis process pool is broken, restarting it")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_process_pool() -> None:
+    """
+    Запускает процессы пула заранее - при старте приложения, пока в процессе нет потоков
+    обработки запросов: fork из такого процесса не наследует захваченные блокировки
+    """
+    get_process_pool().submit(os.getpid).result()
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def _call_recorded(func: Callable[..., T], args: tuple, kwargs: dict) -> Tuple[T, List[Tuple[str, float]]]:
+    # Выполняется в процессе пула: замеры timed возвращаются вместе с результатом
+    with recorded_spans() as spans:
+        result = func(*args, **kwargs)
+    return result, spans
+
+
+def map_in_pool(func: Callable[..., T], calls: List[tuple]) -> List[T]:
+    """
+    Выполняет func(*args) для каждого набора аргументов в пуле процессов и ждет все результаты.
+    Если пул сломан (процесс пула упал), пул пересоздается и вызовы повторяются один раз.
+    """
+    def run(pool: ProcessPoolExecutor) -> List[Tuple[T, List[Tuple[str, float]]]]:
+        futures = [pool.submit(_call_recorded, func, args, {}) for args in calls]
+        return [future.result() for future in futures]
+
+    pool = get_process_pool()
+    try:
+        outputs = run(pool)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        outputs = run(get_process_pool())
+    for _, spans in outputs:
+        observe_spans(spans)
+    return [result for result, _ in outputs]
+
+
+async def run_in_process(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Выполняет func в пуле процессов, не блокируя цикл событий.
+    func и аргументы должны сериализоваться pickle (функции уровня модуля, массивы numpy).
+    Сломанный пул пересоздается, вызов повторяется один раз.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(_call_recorded, func, args, kwargs)
+    pool = get_process_pool()
+    try:
+        result, spans = await loop.run_in_executor(pool, call)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        result, spans = await loop.run_in_executor(get_process_pool(), call)
+    observe_spans(spans)
+    return result